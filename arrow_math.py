@@ -0,0 +1,56 @@
+"""Scalar geometry kernels for arrow updates.
+
+The endpoint and arrowhead math is kept here as plain float functions so the
+hot path is free of Qt objects. When numba is installed the kernels are
+JIT-compiled (cached to disk to avoid first-run compile stalls); otherwise
+they run as ordinary Python with identical results.
+"""
+from math import cos, sin
+
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
+
+# cos(pi/6) and sin(pi/6), for expanding cos/sin(angle +- pi/6)
+_COS30 = 0.8660254037844387
+_SIN30 = 0.5
+
+
+@njit(cache=True)
+def connection_points(scx, scy, sl, st, sr, sb,
+                      ecx, ecy, el, et, er, eb):
+    """Compute both arrow endpoints from shape centers and bounding rects.
+
+    Returns (start_x, start_y, end_x, end_y). The attachment side depends
+    only on the center-to-center direction, shared (negated) between the
+    two shapes, so one dx/dy comparison picks both edges.
+    """
+    dx = ecx - scx
+    dy = ecy - scy
+
+    if abs(dx) > abs(dy):
+        if dx > 0:
+            return sr, scy, el, ecy
+        return sl, scy, er, ecy
+    if dy > 0:
+        return scx, sb, ecx, et
+    return scx, st, ecx, eb
+
+
+@njit(cache=True)
+def head_points(x, y, angle, size):
+    """Compute the two base vertices of an arrowhead at (x, y).
+
+    Returns (p2x, p2y, p3x, p3y). Uses the angle-sum identities so only one
+    cos/sin pair is evaluated per head.
+    """
+    ca = cos(angle) * size
+    sa = sin(angle) * size
+    return (x - (ca * _COS30 + sa * _SIN30),
+            y - (sa * _COS30 - ca * _SIN30),
+            x - (ca * _COS30 - sa * _SIN30),
+            y - (sa * _COS30 + ca * _SIN30))
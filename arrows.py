@@ -1,64 +1,97 @@
-import math
+from functools import lru_cache
+from math import atan2, pi
+
 from PyQt5.QtWidgets import QGraphicsLineItem, QGraphicsPolygonItem, QGraphicsTextItem
 from PyQt5.QtCore import Qt, QPointF, QLineF
 from PyQt5.QtGui import QPen, QBrush, QColor, QPolygonF, QFont
 
+import arrow_math
+
+
+@lru_cache(maxsize=128)
+def _get_label_font(size):
+    """Build a label font once per point size; QFont construction hits the
+    font database, which is slow enough to matter on bulk loads."""
+    font = QFont()
+    font.setPointSize(size)
+    return font
+
 
 class ArrowHead(QGraphicsPolygonItem):
     """Arrowhead triangle."""
-    
+
     ARROW_SIZE = 12
-    
+
+    # Shared brushes keyed by color name - QBrush creation is expensive
+    _brush_cache = {}
+
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.setBrush(QBrush(QColor("#333333")))
+        self.setBrush(self._get_brush("#333333"))
         self.setPen(QPen(Qt.NoPen))
+
+    @classmethod
+    def _get_brush(cls, color):
+        key = color.name() if isinstance(color, QColor) else color
+        brush = cls._brush_cache.get(key)
+        if brush is None:
+            brush = cls._brush_cache[key] = QBrush(QColor(key))
+        return brush
     
     def update_position(self, line_end, angle):
-        p1 = line_end
-        p2 = QPointF(
-            line_end.x() - self.ARROW_SIZE * math.cos(angle - math.pi/6),
-            line_end.y() - self.ARROW_SIZE * math.sin(angle - math.pi/6)
-        )
-        p3 = QPointF(
-            line_end.x() - self.ARROW_SIZE * math.cos(angle + math.pi/6),
-            line_end.y() - self.ARROW_SIZE * math.sin(angle + math.pi/6)
-        )
-        self.setPolygon(QPolygonF([p1, p2, p3]))
+        p2x, p2y, p3x, p3y = arrow_math.head_points(
+            line_end.x(), line_end.y(), angle, self.ARROW_SIZE)
+        self.setPolygon(QPolygonF([line_end, QPointF(p2x, p2y), QPointF(p3x, p3y)]))
     
     def set_color(self, color):
-        self.setBrush(QBrush(QColor(color)))
+        self.setBrush(self._get_brush(color))
 
 
 class Arrow(QGraphicsLineItem):
     """Arrow connecting two shapes."""
     
-    def __init__(self, start_shape, end_shape, bidirectional=False, color="#333333"):
+    def __init__(self, start_shape, end_shape, bidirectional=False, color="#333333",
+                 defer_update=False):
         super().__init__()
         
         self.start_shape = start_shape
         self.end_shape = end_shape
         self.bidirectional = bidirectional
         self.arrow_color = QColor(color)
+        self._color_hex = self.arrow_color.name()
         self.label = None
         self.label_color = QColor("#333333")  # Default label color
+        self._label_color_hex = self.label_color.name()
         self.label_font_size = 9  # Default label font size
+        self._label_size = None  # Cached label bounding size, reset on text/font change
+        self._last_start = None  # Last computed endpoints, to skip no-op updates
+        self._last_end = None
+        self._update_deferred = False  # Geometry pending while off-screen
         
-        self.setPen(QPen(self.arrow_color, 2, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin))
+        self._normal_pen = QPen(self.arrow_color, 2, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
+        self._selected_pen = QPen(QColor("#ff6b6b"), 3, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
+        self.setPen(self._normal_pen)
         self.setFlags(self.ItemIsSelectable)
         self.setZValue(-1)
         
         self.end_head = ArrowHead(self)
         self.start_head = ArrowHead(self) if bidirectional else None
-        
+        self.end_head.set_color(self.arrow_color)
+        if self.start_head:
+            self.start_head.set_color(self.arrow_color)
+
         start_shape.add_arrow(self)
         end_shape.add_arrow(self)
-        
-        self.update_position()
+
+        # Bulk loaders pass defer_update=True and run one batched
+        # update_position pass after every item is in the scene
+        if not defer_update:
+            self.update_position()
     
     def set_label_color(self, color):
         """Set the label color."""
         self.label_color = QColor(color)
+        self._label_color_hex = self.label_color.name()
         if self.label:
             self.label.setDefaultTextColor(self.label_color)
     
@@ -70,9 +103,8 @@ class Arrow(QGraphicsLineItem):
         """Set the font size for the label."""
         self.label_font_size = size
         if self.label:
-            font = self.label.font()
-            font.setPointSize(size)
-            self.label.setFont(font)
+            self.label.setFont(_get_label_font(size))
+            self._label_size = self.label.boundingRect().size()
             self.center_label()
     
     def get_label_font_size(self):
@@ -86,55 +118,114 @@ class Arrow(QGraphicsLineItem):
             self.label = QGraphicsTextItem(text, self)
             self.label.setDefaultTextColor(self.label_color)
         # Apply font size
-        font = QFont()
-        font.setPointSize(self.label_font_size)
-        self.label.setFont(font)
+        self.label.setFont(_get_label_font(self.label_font_size))
+        self._label_size = self.label.boundingRect().size()
         self.center_label()
-    
+
     def center_label(self):
         if self.label:
             line = self.line()
-            mid_point = QPointF(
-                (line.p1().x() + line.p2().x()) / 2,
-                (line.p1().y() + line.p2().y()) / 2
-            )
-            label_rect = self.label.boundingRect()
+            # Use the size cached on text/font change; boundingRect() re-runs
+            # text layout and this is called on every geometry update
+            size = self._label_size
+            if size is None:
+                size = self._label_size = self.label.boundingRect().size()
             self.label.setPos(
-                mid_point.x() - label_rect.width() / 2,
-                mid_point.y() - label_rect.height() - 2
+                (line.p1().x() + line.p2().x()) / 2 - size.width() / 2,
+                (line.p1().y() + line.p2().y()) / 2 - size.height() - 2
             )
     
-    def update_position(self):
+    def update_position(self, moved_shape=None, moved_center=None, force=False):
         if not self.start_shape or not self.end_shape:
             return
-        
-        start_center = self.start_shape.get_center()
-        end_center = self.end_shape.get_center()
-        
-        start_point = self.start_shape.get_connection_point(end_center)
-        end_point = self.end_shape.get_connection_point(start_center)
-        
+
+        # When a shape drags all of its arrows, it computes its own center
+        # once and passes it in so N arrows don't redo the same lookup.
+        if moved_shape is self.start_shape:
+            start_center = moved_center
+            end_center = self.end_shape.get_center()
+        elif moved_shape is self.end_shape:
+            start_center = self.start_shape.get_center()
+            end_center = moved_center
+        else:
+            start_center = self.start_shape.get_center()
+            end_center = self.end_shape.get_center()
+
+        # Cached on the shapes and invalidated when they move or resize
+        start_rect = self.start_shape.scene_rect()
+        end_rect = self.end_shape.scene_rect()
+
+        # Off-screen arrows don't need live geometry; mark them dirty and
+        # let the scene resolve the update once the viewport reaches them
+        # (invalidate_visible_rect re-tests deferred arrows on scroll).
+        # Never defer before the first geometry pass: a null line has a
+        # null bounding rect, so Qt would cull the item and paint() could
+        # never catch up. Exports pass force=True because they render
+        # regions the viewport test would wrongly defer.
+        if not force:
+            scene = self.scene()
+            if scene is not None and hasattr(scene, 'visible_rect'):
+                visible = scene.visible_rect()
+                if (visible is not None and self._last_start is not None
+                        and not visible.intersects(start_rect.united(end_rect))):
+                    self._update_deferred = True
+                    return
+        self._update_deferred = False
+
+        sx, sy, ex, ey = arrow_math.connection_points(
+            start_center.x(), start_center.y(),
+            start_rect.left(), start_rect.top(),
+            start_rect.right(), start_rect.bottom(),
+            end_center.x(), end_center.y(),
+            end_rect.left(), end_rect.top(),
+            end_rect.right(), end_rect.bottom())
+        start_point = QPointF(sx, sy)
+        end_point = QPointF(ex, ey)
+
+        # Skip the line/head/label rebuild (and the repaint it invalidates)
+        # when the computed endpoints match the previous update
+        ls, le = self._last_start, self._last_end
+        if (ls is not None
+                and abs(start_point.x() - ls.x()) < 0.01
+                and abs(start_point.y() - ls.y()) < 0.01
+                and abs(end_point.x() - le.x()) < 0.01
+                and abs(end_point.y() - le.y()) < 0.01):
+            return
+        self._last_start = start_point
+        self._last_end = end_point
+
         self.setLine(QLineF(start_point, end_point))
         
         line = self.line()
-        angle = math.atan2(line.dy(), line.dx())
+        angle = atan2(line.dy(), line.dx())
         
         self.end_head.update_position(end_point, angle)
-        self.end_head.set_color(self.arrow_color)
-        
+
         if self.start_head:
-            reverse_angle = angle + math.pi
+            reverse_angle = angle + pi
             self.start_head.update_position(start_point, reverse_angle)
-            self.start_head.set_color(self.arrow_color)
-        
+
         self.center_label()
     
     def set_color(self, color):
         self.arrow_color = QColor(color)
-        self.setPen(QPen(self.arrow_color, 2, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin))
+        self._color_hex = self.arrow_color.name()
+        self._normal_pen = QPen(self.arrow_color, 2, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
+        # A selected arrow keeps its highlight pen installed; the new
+        # normal pen takes over when the selection drops
+        if not self.isSelected():
+            self.setPen(self._normal_pen)
         self.end_head.set_color(color)
         if self.start_head:
             self.start_head.set_color(color)
+
+    def itemChange(self, change, value):
+        # Swap the installed pen here rather than in paint() so the
+        # bounding rect tracks the wider selection pen - setPen triggers
+        # prepareGeometryChange, which paint() must never do
+        if change == self.ItemSelectedHasChanged:
+            self.setPen(self._selected_pen if value else self._normal_pen)
+        return super().itemChange(change, value)
     
     def detach(self):
         if self.start_shape:
@@ -143,9 +234,9 @@ class Arrow(QGraphicsLineItem):
             self.end_shape.remove_arrow(self)
     
     def paint(self, painter, option, widget=None):
-        if self.isSelected():
-            pen = QPen(QColor("#ff6b6b"), 3, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
-        else:
-            pen = QPen(self.arrow_color, 2, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
-        self.setPen(pen)
-        super().paint(painter, option, widget)
\ No newline at end of file
+        # Geometry is never touched here: exports render from worker
+        # threads, and deferred updates are resolved before paint runs
+        # (on scroll by invalidate_visible_rect, on export by the
+        # export manager)
+        painter.setPen(self.pen())
+        painter.drawLine(self.line())
\ No newline at end of file
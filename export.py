@@ -1,26 +1,115 @@
 import json
+import re
+
+try:
+    import orjson  # Optional C-accelerated JSON, ~5-10x faster encode/decode
+except ImportError:
+    orjson = None
+
 from PyQt5.QtWidgets import QFileDialog, QMessageBox, QApplication
-from PyQt5.QtCore import QRectF, QSize
+from PyQt5.QtCore import QRectF, QSize, QRunnable, QThreadPool, QEventLoop
 from PyQt5.QtGui import QPainter, QImage, QColor
 from PyQt5.QtSvg import QSvgGenerator
 
-from shapes import (DiagramRect, DiagramOval, DiagramDiamond, DiagramTriangle,
-                    DiagramTriangleInverted, DiagramTriangleLeft, DiagramTriangleRight,
-                    DiagramText)
+from shapes import (BaseShape, DiagramRect, DiagramOval, DiagramDiamond,
+                    DiagramTriangle, DiagramTriangleInverted, DiagramTriangleLeft,
+                    DiagramTriangleRight, DiagramText)
 from arrows import Arrow
 
 
+def _serialize_shape(item, shape_id):
+    """Serialize a geometric shape to a dictionary."""
+    return {
+        'id': shape_id,
+        'type': item.__class__.__name__,
+        'x': round(item.pos().x(), 2),
+        'y': round(item.pos().y(), 2),
+        'width': round(item.shape_width, 2),
+        'height': round(item.shape_height, 2),
+        'color': item._color_hex,
+        'label': item.label.toPlainText() if item.label else None,
+        'label_color': item._label_color_hex,
+        'label_font_size': item.label_font_size if hasattr(item, 'label_font_size') else 14,
+        'z': item.zValue()
+    }
+
+
+def _serialize_text(item, shape_id):
+    """Serialize a text item to a dictionary."""
+    return {
+        'id': shape_id,
+        'type': 'DiagramText',
+        'x': round(item.pos().x(), 2),
+        'y': round(item.pos().y(), 2),
+        'text': item.toPlainText(),
+        'color': item._color_hex,
+        'font_family': item.font_family,
+        'font_size': item.font_size,
+        'bold': item.is_bold,
+        'underline': item.is_underline,
+        'z': item.zValue()
+    }
+
+
+# Exact-type dispatch: one dict lookup per item instead of chained isinstance
+_SHAPE_SERIALIZERS = {
+    DiagramRect: _serialize_shape,
+    DiagramOval: _serialize_shape,
+    DiagramDiamond: _serialize_shape,
+    DiagramTriangle: _serialize_shape,
+    DiagramTriangleInverted: _serialize_shape,
+    DiagramTriangleLeft: _serialize_shape,
+    DiagramTriangleRight: _serialize_shape,
+    DiagramText: _serialize_text,
+}
+
+
+class _TileRenderJob(QRunnable):
+    """Renders one horizontal slice of the scene into its own image.
+
+    QImage painting is thread-safe, so slices can rasterize in parallel as
+    long as nothing mutates the scene while the export runs.
+    """
+
+    def __init__(self, scene, image, target_rect, source_rect):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.scene = scene
+        self.image = image
+        self.target_rect = target_rect
+        self.source_rect = source_rect
+
+    def run(self):
+        painter = QPainter(self.image)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setRenderHint(QPainter.TextAntialiasing)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        self.scene.render(painter, self.target_rect, self.source_rect)
+        painter.end()
+
+
 class ExportManager:
     """Handles exporting diagram to various formats."""
-    
+
     PADDING = 20
     PNG_SCALE = 2
+    TILE_HEIGHT = 512  # Minimum tile height in output pixels for PNG workers
     
     def __init__(self, scene):
         self.scene = scene
+        # Reused across exports: grow-only framebuffer and one QPainter, so
+        # repeated batch exports don't reallocate huge buffers each time
+        self._png_image = None
+        self._painter = QPainter()
+        self._export_active = False  # Guards against re-entry while tiles render
     
     def _get_export_rect(self):
         """Get bounding rectangle of all items with padding."""
+        # Arrows outside the viewport defer geometry updates; the export
+        # renders them regardless, so bring any stragglers current first
+        for arrow in self.scene._export_arrows:
+            if arrow._update_deferred:
+                arrow.update_position(force=True)
         items_rect = self.scene.itemsBoundingRect()
         if items_rect.isEmpty():
             return None
@@ -38,211 +127,202 @@ class ExportManager:
         
         shape_ids = {}  # Map shape objects to IDs for arrow references
         shape_id = 0
-        
-        # Serialize shapes
-        for item in self.scene.items():
-            if isinstance(item, (DiagramRect, DiagramOval, DiagramDiamond, 
-                                 DiagramTriangle, DiagramTriangleInverted,
-                                 DiagramTriangleLeft, DiagramTriangleRight)):
-                shape_data = {
-                    'id': shape_id,
-                    'type': item.__class__.__name__,
-                    'x': item.pos().x(),
-                    'y': item.pos().y(),
-                    'width': item.shape_width,
-                    'height': item.shape_height,
-                    'color': item.shape_color.name(),
-                    'label': item.label.toPlainText() if item.label else None,
-                    'label_color': item.label_color.name() if hasattr(item, 'label_color') else '#ffffff',
-                    'label_font_size': item.label_font_size if hasattr(item, 'label_font_size') else 14,
-                    'z': item.zValue()
-                }
-                data['shapes'].append(shape_data)
+
+        # The scene keeps a registry of exportable items, so this walks only
+        # shapes and arrows rather than every QGraphicsItem in the scene
+        for item in self.scene._export_shapes:
+            serializer = _SHAPE_SERIALIZERS.get(type(item))
+            if serializer is not None:
+                data['shapes'].append(serializer(item, shape_id))
                 shape_ids[item] = shape_id
                 shape_id += 1
-            
-            elif isinstance(item, DiagramText):
-                shape_data = {
-                    'id': shape_id,
-                    'type': 'DiagramText',
-                    'x': item.pos().x(),
-                    'y': item.pos().y(),
-                    'text': item.toPlainText(),
-                    'color': item.text_color.name(),
-                    'font_family': item.font_family,
-                    'font_size': item.font_size,
-                    'bold': item.is_bold,
-                    'underline': item.is_underline,
-                    'z': item.zValue()
+
+        for item in self.scene._export_arrows:
+            if item.start_shape in shape_ids and item.end_shape in shape_ids:
+                arrow_data = {
+                    'start_id': shape_ids[item.start_shape],
+                    'end_id': shape_ids[item.end_shape],
+                    'bidirectional': item.bidirectional,
+                    'color': item._color_hex,
+                    'label': item.label.toPlainText() if item.label else None,
+                    'label_color': item._label_color_hex,
+                    'label_font_size': item.label_font_size if hasattr(item, 'label_font_size') else 9
                 }
-                data['shapes'].append(shape_data)
-                shape_ids[item] = shape_id
-                shape_id += 1
-        
-        # Serialize arrows
-        for item in self.scene.items():
-            if isinstance(item, Arrow):
-                if item.start_shape in shape_ids and item.end_shape in shape_ids:
-                    arrow_data = {
-                        'start_id': shape_ids[item.start_shape],
-                        'end_id': shape_ids[item.end_shape],
-                        'bidirectional': item.bidirectional,
-                        'color': item.arrow_color.name(),
-                        'label': item.label.toPlainText() if item.label else None,
-                        'label_color': item.label_color.name() if hasattr(item, 'label_color') else '#333333',
-                        'label_font_size': item.label_font_size if hasattr(item, 'label_font_size') else 9
-                    }
-                    data['arrows'].append(arrow_data)
-        
+                data['arrows'].append(arrow_data)
+
         return data
     
     def _deserialize_scene(self, data):
         """Deserialize shapes and arrows from a dictionary."""
         self.scene.clear_all()
-        
-        shape_map = {}  # Map IDs to created shape objects
-        
-        # Create shapes
-        for shape_data in data.get('shapes', []):
-            shape_type = shape_data.get('type')
-            shape_id = shape_data.get('id')
-            x = shape_data.get('x', 0)
-            y = shape_data.get('y', 0)
+
+        # Defer spatial indexing and signals until every item is in place;
+        # re-indexing per addItem makes bulk loads quadratic
+        self.scene.begin_bulk_update()
+        try:
+            # Shapes fire position-change callbacks as they are placed even
+            # though no arrows exist yet; silence them for the whole build
+            with BaseShape.bulk_load():
+                shape_map = {}  # Map IDs to created shape objects
+        
+                # Create shapes
+                for shape_data in data.get('shapes', []):
+                    shape_type = shape_data.get('type')
+                    shape_id = shape_data.get('id')
+                    x = shape_data.get('x', 0)
+                    y = shape_data.get('y', 0)
             
-            shape = None
+                    shape = None
             
-            if shape_type == 'DiagramRect':
-                shape = DiagramRect(
-                    x, y,
-                    width=shape_data.get('width', 100),
-                    height=shape_data.get('height', 60),
-                    color=shape_data.get('color', '#3498db')
-                )
-            elif shape_type == 'DiagramOval':
-                shape = DiagramOval(
-                    x, y,
-                    width=shape_data.get('width', 100),
-                    height=shape_data.get('height', 60),
-                    color=shape_data.get('color', '#2ecc71')
-                )
-            elif shape_type == 'DiagramDiamond':
-                shape = DiagramDiamond(
-                    x, y,
-                    width=shape_data.get('width', 100),
-                    height=shape_data.get('height', 60),
-                    color=shape_data.get('color', '#e74c3c')
-                )
-            elif shape_type == 'DiagramTriangle':
-                shape = DiagramTriangle(
-                    x, y,
-                    width=shape_data.get('width', 100),
-                    height=shape_data.get('height', 80),
-                    color=shape_data.get('color', '#9b59b6')
-                )
-            elif shape_type == 'DiagramTriangleInverted':
-                shape = DiagramTriangleInverted(
-                    x, y,
-                    width=shape_data.get('width', 100),
-                    height=shape_data.get('height', 80),
-                    color=shape_data.get('color', '#e67e22')
-                )
-            elif shape_type == 'DiagramTriangleLeft':
-                shape = DiagramTriangleLeft(
-                    x, y,
-                    width=shape_data.get('width', 80),
-                    height=shape_data.get('height', 100),
-                    color=shape_data.get('color', '#1abc9c')
-                )
-            elif shape_type == 'DiagramTriangleRight':
-                shape = DiagramTriangleRight(
-                    x, y,
-                    width=shape_data.get('width', 80),
-                    height=shape_data.get('height', 100),
-                    color=shape_data.get('color', '#3498db')
-                )
-            elif shape_type == 'DiagramText':
-                shape = DiagramText(
-                    x, y,
-                    text=shape_data.get('text', 'Text'),
-                    font_family=shape_data.get('font_family', 'Arial'),
-                    font_size=shape_data.get('font_size', 14),
-                    color=shape_data.get('color', '#333333'),
-                    bold=shape_data.get('bold', False),
-                    underline=shape_data.get('underline', False)
-                )
+                    if shape_type == 'DiagramRect':
+                        shape = DiagramRect(
+                            x, y,
+                            width=shape_data.get('width', 100),
+                            height=shape_data.get('height', 60),
+                            color=shape_data.get('color', '#3498db')
+                        )
+                    elif shape_type == 'DiagramOval':
+                        shape = DiagramOval(
+                            x, y,
+                            width=shape_data.get('width', 100),
+                            height=shape_data.get('height', 60),
+                            color=shape_data.get('color', '#2ecc71')
+                        )
+                    elif shape_type == 'DiagramDiamond':
+                        shape = DiagramDiamond(
+                            x, y,
+                            width=shape_data.get('width', 100),
+                            height=shape_data.get('height', 60),
+                            color=shape_data.get('color', '#e74c3c')
+                        )
+                    elif shape_type == 'DiagramTriangle':
+                        shape = DiagramTriangle(
+                            x, y,
+                            width=shape_data.get('width', 100),
+                            height=shape_data.get('height', 80),
+                            color=shape_data.get('color', '#9b59b6')
+                        )
+                    elif shape_type == 'DiagramTriangleInverted':
+                        shape = DiagramTriangleInverted(
+                            x, y,
+                            width=shape_data.get('width', 100),
+                            height=shape_data.get('height', 80),
+                            color=shape_data.get('color', '#e67e22')
+                        )
+                    elif shape_type == 'DiagramTriangleLeft':
+                        shape = DiagramTriangleLeft(
+                            x, y,
+                            width=shape_data.get('width', 80),
+                            height=shape_data.get('height', 100),
+                            color=shape_data.get('color', '#1abc9c')
+                        )
+                    elif shape_type == 'DiagramTriangleRight':
+                        shape = DiagramTriangleRight(
+                            x, y,
+                            width=shape_data.get('width', 80),
+                            height=shape_data.get('height', 100),
+                            color=shape_data.get('color', '#3498db')
+                        )
+                    elif shape_type == 'DiagramText':
+                        shape = DiagramText(
+                            x, y,
+                            text=shape_data.get('text', 'Text'),
+                            font_family=shape_data.get('font_family', 'Arial'),
+                            font_size=shape_data.get('font_size', 14),
+                            color=shape_data.get('color', '#333333'),
+                            bold=shape_data.get('bold', False),
+                            underline=shape_data.get('underline', False)
+                        )
             
-            if shape:
-                self.scene.addItem(shape)
-                shape_map[shape_id] = shape
-                
-                # Set z-order if specified
-                if 'z' in shape_data:
-                    shape.setZValue(shape_data['z'])
+                    if shape:
+                        self.scene.addItem(shape)
+                        shape_map[shape_id] = shape
                 
-                # Set label color and font size for non-text shapes
-                if shape_type != 'DiagramText':
-                    if hasattr(shape, 'set_label_color'):
-                        label_color = shape_data.get('label_color', '#ffffff')
-                        shape.set_label_color(label_color)
-                    if hasattr(shape, 'label_font_size'):
-                        shape.label_font_size = shape_data.get('label_font_size', 14)
+                        # Set z-order if specified
+                        if 'z' in shape_data:
+                            shape.setZValue(shape_data['z'])
                 
-                # Add label for non-text shapes
-                if shape_type != 'DiagramText' and shape_data.get('label'):
-                    shape.add_label(shape_data['label'])
-        
-        # Create arrows
-        for arrow_data in data.get('arrows', []):
-            start_id = arrow_data.get('start_id')
-            end_id = arrow_data.get('end_id')
-            
-            if start_id in shape_map and end_id in shape_map:
-                arrow = Arrow(
-                    shape_map[start_id],
-                    shape_map[end_id],
-                    bidirectional=arrow_data.get('bidirectional', False),
-                    color=arrow_data.get('color', '#333333')
-                )
-                self.scene.addItem(arrow)
-                
-                # Set label color and font size before adding label
-                if 'label_color' in arrow_data:
-                    arrow.set_label_color(arrow_data['label_color'])
-                if 'label_font_size' in arrow_data:
-                    arrow.label_font_size = arrow_data['label_font_size']
+                        # Set label color and font size for non-text shapes
+                        if shape_type != 'DiagramText':
+                            if hasattr(shape, 'set_label_color'):
+                                label_color = shape_data.get('label_color', '#ffffff')
+                                shape.set_label_color(label_color)
+                            if hasattr(shape, 'label_font_size'):
+                                shape.label_font_size = shape_data.get('label_font_size', 14)
                 
-                if arrow_data.get('label'):
-                    arrow.add_label(arrow_data['label'])
-        
-        # Force scene to update its internal index and refresh
+                        # Add label for non-text shapes
+                        if shape_type != 'DiagramText' and shape_data.get('label'):
+                            shape.add_label(shape_data['label'])
+        
+                # Create arrows with geometry deferred; positions are resolved in
+                # one batched pass below
+                arrows = []
+                for arrow_data in data.get('arrows', []):
+                    start_id = arrow_data.get('start_id')
+                    end_id = arrow_data.get('end_id')
+
+                    if start_id in shape_map and end_id in shape_map:
+                        arrow = Arrow(
+                            shape_map[start_id],
+                            shape_map[end_id],
+                            bidirectional=arrow_data.get('bidirectional', False),
+                            color=arrow_data.get('color', '#333333'),
+                            defer_update=True
+                        )
+                        self.scene.addItem(arrow)
+                        arrows.append(arrow)
+
+                        # Set label color and font size before adding label
+                        if 'label_color' in arrow_data:
+                            arrow.set_label_color(arrow_data['label_color'])
+                        if 'label_font_size' in arrow_data:
+                            arrow.label_font_size = arrow_data['label_font_size']
+
+                        if arrow_data.get('label'):
+                            arrow.add_label(arrow_data['label'])
+
+                for arrow in arrows:
+                    arrow.update_position()
+
+        finally:
+            # Re-enable signals and indexing even if the payload is
+            # malformed; a failed load must not leave the scene muted
+            self.scene.end_bulk_update()
         self.scene.setSceneRect(self.scene.sceneRect())
         self.scene.update()
     
-    def export_json(self, parent=None):
-        """Export scene to JSON file."""
-        items = [item for item in self.scene.items() 
-                 if isinstance(item, (DiagramRect, DiagramOval, DiagramDiamond, 
-                                      DiagramTriangle, DiagramTriangleInverted,
-                                      DiagramTriangleLeft, DiagramTriangleRight,
-                                      DiagramText, Arrow))]
-        if not items:
+    def export_json(self, parent=None, compact=True):
+        """Export scene to JSON file.
+
+        Compact output (no indentation, tight separators) is the default;
+        pass compact=False for a human-readable indented file.
+        """
+        # Serialize first; the single pass doubles as the emptiness check,
+        # avoiding a separate scene traversal just to count exportable items
+        data = self._serialize_scene()
+        if not data['shapes'] and not data['arrows']:
             QMessageBox.warning(parent, "Export", "Nothing to export!")
             return False
-        
+
         filepath, _ = QFileDialog.getSaveFileName(
             parent, "Save Diagram", "", "Diagram Files (*.json)"
         )
-        
+
         if not filepath:
             return False
-        
+
         if not filepath.endswith('.json'):
             filepath += '.json'
-        
-        data = self._serialize_scene()
-        
-        with open(filepath, 'w') as f:
-            json.dump(data, f, indent=2)
+
+        if orjson is not None:
+            with open(filepath, 'wb') as f:
+                f.write(orjson.dumps(data, option=0 if compact else orjson.OPT_INDENT_2))
+        else:
+            with open(filepath, 'w') as f:
+                if compact:
+                    json.dump(data, f, separators=(',', ':'))
+                else:
+                    json.dump(data, f, indent=2)
         
         QMessageBox.information(parent, "Save", f"Saved to {filepath}")
         return filepath
@@ -257,8 +337,12 @@ class ExportManager:
             return False
         
         try:
-            with open(filepath, 'r') as f:
-                data = json.load(f)
+            if orjson is not None:
+                with open(filepath, 'rb') as f:
+                    data = orjson.loads(f.read())
+            else:
+                with open(filepath, 'r') as f:
+                    data = json.load(f)
             
             self._deserialize_scene(data)
             QMessageBox.information(parent, "Load", f"Loaded {filepath}")
@@ -303,7 +387,6 @@ class ExportManager:
         generator.setViewBox(QRectF(0, 0, width, height))
         generator.setResolution(int(dpi))  # Match screen DPI for consistent fonts
         generator.setTitle("Diagram Export")
-        generator.setDescription("Created with Diagram Builder")
         
         painter = QPainter()
         painter.begin(generator)
@@ -315,14 +398,105 @@ class ExportManager:
         
         target_rect = QRectF(0, 0, width, height)
         self.scene.render(painter, target_rect, export_rect)
-        
+
         painter.end()
-        
+
+        self._round_svg_coordinates(filepath)
+
         QMessageBox.information(parent, "Export", f"Saved to {filepath}")
         return filepath
-    
+
+    @staticmethod
+    def _round_svg_coordinates(filepath):
+        """Rewrite an SVG file clamping coordinates to two decimals.
+
+        QSvgGenerator emits full-precision floats; two decimals are below
+        visible resolution and cut file size substantially.
+        """
+        with open(filepath, 'r', encoding='utf-8') as f:
+            svg = f.read()
+
+        # Only rewrite numbers inside tags; text node content between tags
+        # is user-visible label text and must pass through verbatim
+        round_num = lambda m: format(float(m.group(0)), '.2f')
+        svg = re.sub(
+            r'<[^>]*>',
+            lambda tag: re.sub(r'\d+\.\d{3,}', round_num, tag.group(0)),
+            svg)
+
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(svg)
+
+    def _render_png_tiled(self, width, height, export_rect):
+        """Rasterize the scene into a QImage using parallel tile workers.
+
+        The image is split into horizontal slices rendered on the global
+        thread pool, keeping the GUI thread pumping events instead of
+        blocking on one large synchronous render.
+        """
+        tile_count = max(1, min(QThreadPool.globalInstance().maxThreadCount(),
+                                height // self.TILE_HEIGHT))
+
+        image = self._png_image
+        if image is None or image.width() < width or image.height() < height:
+            image = self._png_image = QImage(
+                max(width, image.width() if image else 0),
+                max(height, image.height() if image else 0),
+                QImage.Format_RGB32
+            )
+        image.fill(QColor("#f9f9f9"))
+
+        if tile_count == 1:
+            painter = self._painter
+            painter.begin(image)
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.setRenderHint(QPainter.TextAntialiasing)
+            painter.setRenderHint(QPainter.SmoothPixmapTransform)
+            self.scene.render(painter, QRectF(0, 0, width, height), export_rect)
+            painter.end()
+            return image
+
+        jobs = []
+        step = height / tile_count
+        for i in range(tile_count):
+            y0 = int(i * step)
+            y1 = height if i == tile_count - 1 else int((i + 1) * step)
+            tile_height = y1 - y0
+            tile = QImage(width, tile_height, QImage.Format_RGB32)
+            tile.fill(QColor("#f9f9f9"))
+            source = QRectF(
+                export_rect.left(),
+                export_rect.top() + y0 / self.PNG_SCALE,
+                export_rect.width(),
+                tile_height / self.PNG_SCALE
+            )
+            job = _TileRenderJob(self.scene, tile,
+                                 QRectF(0, 0, width, tile_height), source)
+            jobs.append((y0, job))
+
+        pool = QThreadPool.globalInstance()
+        for _, job in jobs:
+            pool.start(job)
+        # Keep paint/timer events flowing but drop user input: the workers
+        # read the scene concurrently, so nothing may mutate it mid-render
+        while not pool.waitForDone(50):
+            QApplication.processEvents(QEventLoop.ExcludeUserInputEvents)
+
+        painter = self._painter
+        painter.begin(image)
+        for y0, job in jobs:
+            painter.drawImage(0, y0, job.image)
+        painter.end()
+
+        return image
+
     def export_png(self, parent=None):
         """Export scene to PNG file."""
+        # A second trigger while tiles are rendering would begin() the
+        # shared painter twice; ignore it
+        if self._export_active:
+            return False
+
         export_rect = self._get_export_rect()
         if not export_rect:
             QMessageBox.warning(parent, "Export", "Nothing to export!")
@@ -342,20 +516,16 @@ class ExportManager:
         
         width = int(export_rect.width() * self.PNG_SCALE)
         height = int(export_rect.height() * self.PNG_SCALE)
-        image = QImage(width, height, QImage.Format_ARGB32)
-        image.fill(QColor("#f9f9f9"))
-        
-        painter = QPainter()
-        painter.begin(image)
-        painter.setRenderHint(QPainter.Antialiasing)
-        painter.setRenderHint(QPainter.TextAntialiasing)
-        painter.setRenderHint(QPainter.SmoothPixmapTransform)
-        
-        target_rect = QRectF(0, 0, width, height)
-        self.scene.render(painter, target_rect, export_rect)
-        
-        painter.end()
-        
+        self._export_active = True
+        try:
+            image = self._render_png_tiled(width, height, export_rect)
+        finally:
+            self._export_active = False
+
+        # The persistent buffer may be larger than this export; save only
+        # the rendered region
+        if image.width() != width or image.height() != height:
+            image = image.copy(0, 0, width, height)
         image.save(filepath)
         
         QMessageBox.information(parent, "Export", f"Saved to {filepath}")
@@ -1,24 +1,72 @@
-from PyQt5.QtWidgets import (QMainWindow, QGraphicsView, QToolBar, QAction, 
+from functools import lru_cache, partial
+
+from PyQt5.QtWidgets import (QMainWindow, QGraphicsView, QToolBar, QAction,
                              QActionGroup, QColorDialog, QPushButton, QLabel,
-                             QFontComboBox, QSpinBox, QWidget, QHBoxLayout)
-from PyQt5.QtCore import Qt, QSize
-from PyQt5.QtGui import QPainter, QColor, QIcon, QPixmap, QPainterPath, QPolygonF, QPen, QBrush, QFont
+                             QFontComboBox, QSpinBox, QWidget, QHBoxLayout,
+                             QOpenGLWidget)
+from PyQt5.QtCore import Qt, QSize, QPointF, QTimer
+from PyQt5.QtGui import (QPainter, QColor, QIcon, QPixmap, QImage, QPainterPath,
+                         QPolygonF, QPen, QBrush, QFont)
 
 from scene import DiagramScene
+from shapes import DiagramText
 from export import ExportManager
 
 
-def create_icon(draw_func, size=24, color="#555555"):
-    """Create an icon by drawing on a pixmap."""
-    pixmap = QPixmap(size, size)
-    pixmap.fill(Qt.transparent)
-    painter = QPainter(pixmap)
-    painter.setRenderHint(QPainter.Antialiasing)
+# Icon geometry shared by the draw functions, built once at import
+_DIAMOND_POLY = QPolygonF([
+    QPointF(12, 4), QPointF(20, 12), QPointF(12, 20), QPointF(4, 12)
+])
+_TRIANGLE_UP_POLY = QPolygonF([
+    QPointF(12, 4), QPointF(20, 20), QPointF(4, 20)
+])
+_TRIANGLE_DOWN_POLY = QPolygonF([
+    QPointF(4, 4), QPointF(20, 4), QPointF(12, 20)
+])
+_TRIANGLE_LEFT_POLY = QPolygonF([
+    QPointF(20, 4), QPointF(20, 20), QPointF(4, 12)
+])
+_TRIANGLE_RIGHT_POLY = QPolygonF([
+    QPointF(4, 4), QPointF(20, 12), QPointF(4, 20)
+])
+_ARROWHEAD_RIGHT = QPolygonF([
+    QPointF(20, 12), QPointF(14, 8), QPointF(14, 16)
+])
+_ARROWHEAD_LEFT = QPolygonF([
+    QPointF(4, 12), QPointF(10, 8), QPointF(10, 16)
+])
+
+
+# Rasterized toolbar icons, keyed by (draw function, size, color) so each
+# icon is drawn once per process rather than on every window creation
+_ICON_CACHE = {}
+
+
+def create_icon(draw_func, size=24, color="#555555", antialias=True):
+    """Create an icon by drawing on an image (cached per draw_func/size/color).
+
+    Rasterizes into a premultiplied-alpha QImage, the fastest format for the
+    raster paint engine, then converts once to a pixmap for the icon. Pass
+    antialias=False for purely axis-aligned glyphs.
+    """
+    key = (draw_func.__name__, size, color, antialias)
+    icon = _ICON_CACHE.get(key)
+    if icon is not None:
+        return icon
+
+    image = QImage(size, size, QImage.Format_ARGB32_Premultiplied)
+    image.fill(0)
+    painter = QPainter(image)
+    if antialias:
+        painter.setRenderHint(QPainter.Antialiasing)
     painter.setPen(QPen(QColor(color), 2))
     painter.setBrush(QBrush(QColor(color)))
     draw_func(painter, size)
     painter.end()
-    return QIcon(pixmap)
+
+    icon = QIcon(QPixmap.fromImage(image))
+    _ICON_CACHE[key] = icon
+    return icon
 
 
 def draw_select(painter, size):
@@ -49,91 +97,40 @@ def draw_oval(painter, size):
 
 def draw_diamond(painter, size):
     """Draw diamond icon."""
-    from PyQt5.QtCore import QPointF
-    points = QPolygonF([
-        QPointF(12, 4),
-        QPointF(20, 12),
-        QPointF(12, 20),
-        QPointF(4, 12)
-    ])
-    painter.drawPolygon(points)
+    painter.drawPolygon(_DIAMOND_POLY)
 
 
 def draw_triangle(painter, size):
     """Draw triangle icon (pointing up)."""
-    from PyQt5.QtCore import QPointF
-    points = QPolygonF([
-        QPointF(12, 4),
-        QPointF(20, 20),
-        QPointF(4, 20)
-    ])
-    painter.drawPolygon(points)
+    painter.drawPolygon(_TRIANGLE_UP_POLY)
 
 
 def draw_triangle_inverted(painter, size):
     """Draw inverted triangle icon (pointing down)."""
-    from PyQt5.QtCore import QPointF
-    points = QPolygonF([
-        QPointF(4, 4),
-        QPointF(20, 4),
-        QPointF(12, 20)
-    ])
-    painter.drawPolygon(points)
+    painter.drawPolygon(_TRIANGLE_DOWN_POLY)
 
 
 def draw_triangle_left(painter, size):
     """Draw left-facing triangle icon (pointing left)."""
-    from PyQt5.QtCore import QPointF
-    points = QPolygonF([
-        QPointF(20, 4),
-        QPointF(20, 20),
-        QPointF(4, 12)
-    ])
-    painter.drawPolygon(points)
+    painter.drawPolygon(_TRIANGLE_LEFT_POLY)
 
 
 def draw_triangle_right(painter, size):
     """Draw right-facing triangle icon (pointing right)."""
-    from PyQt5.QtCore import QPointF
-    points = QPolygonF([
-        QPointF(4, 4),
-        QPointF(20, 12),
-        QPointF(4, 20)
-    ])
-    painter.drawPolygon(points)
+    painter.drawPolygon(_TRIANGLE_RIGHT_POLY)
 
 
 def draw_arrow(painter, size):
     """Draw single arrow icon."""
     painter.drawLine(4, 12, 16, 12)
-    # Arrowhead
-    from PyQt5.QtCore import QPointF
-    points = QPolygonF([
-        QPointF(20, 12),
-        QPointF(14, 8),
-        QPointF(14, 16)
-    ])
-    painter.drawPolygon(points)
+    painter.drawPolygon(_ARROWHEAD_RIGHT)
 
 
 def draw_arrow_bidir(painter, size):
     """Draw bidirectional arrow icon."""
     painter.drawLine(8, 12, 16, 12)
-    from PyQt5.QtCore import QPointF
-    # Right arrowhead
-    points1 = QPolygonF([
-        QPointF(20, 12),
-        QPointF(14, 8),
-        QPointF(14, 16)
-    ])
-    painter.drawPolygon(points1)
-    # Left arrowhead
-    points2 = QPolygonF([
-        QPointF(4, 12),
-        QPointF(10, 8),
-        QPointF(10, 16)
-    ])
-    painter.drawPolygon(points2)
+    painter.drawPolygon(_ARROWHEAD_RIGHT)
+    painter.drawPolygon(_ARROWHEAD_LEFT)
 
 
 def draw_text(painter, size):
@@ -147,24 +144,38 @@ def draw_text(painter, size):
     painter.drawLine(12, 6, 12, 20)  # Vertical stem
 
 
+@lru_cache(maxsize=32)
+def _family_font(family):
+    """QFont(family) resolves through the font database; build each once."""
+    return QFont(family)
+
+
+def _as_qcolor(color):
+    """Return color as a QColor without copying when it already is one."""
+    return color if isinstance(color, QColor) else QColor(color)
+
+
 class ColorButton(QPushButton):
     """Button showing current color."""
-    
+
     def __init__(self, color="#3498db", parent=None):
         super().__init__(parent)
         self.setFixedSize(28, 28)
         self.setToolTip("Choose color")
-        self._color = QColor(color)
+        self._color = _as_qcolor(color)
+        # One pixmap for the button's lifetime, recolored in place
+        self._pixmap = QPixmap(24, 24)
+        self.setIconSize(self._pixmap.size())
         self.update_icon()
-    
+
     def update_icon(self):
-        pixmap = QPixmap(24, 24)
-        pixmap.fill(self._color)
-        self.setIcon(QIcon(pixmap))
-        self.setIconSize(pixmap.size())
+        self._pixmap.fill(self._color)
+        # QIcon caches its rendering, so it must be rebuilt; the pixmap
+        # allocation is what this avoids
+        self.setIcon(QIcon(self._pixmap))
     
     def set_color(self, color):
-        self._color = QColor(color)
+        self._color = _as_qcolor(color)
         self.update_icon()
     
     def get_color(self):
@@ -178,12 +189,44 @@ class DiagramView(QGraphicsView):
         super().__init__(scene, parent)
         # Enable focus to receive keyboard events
         self.setFocusPolicy(Qt.StrongFocus)
-    
+        # OpenGL viewports can't do partial updates; while one is active the
+        # view stays on FullViewportUpdate and skips the rubber-band dance
+        self.gpu_enabled = False
+        # Mode to sit in outside rubber-band drags; retuned by item count
+        self.steady_update_mode = QGraphicsView.SmartViewportUpdate
+
+    def set_steady_update_mode(self, mode):
+        """Set the resting viewport update mode and apply it."""
+        self.steady_update_mode = mode
+        if not self.gpu_enabled:
+            self.setViewportUpdateMode(mode)
+
     def mousePressEvent(self, event):
         # Ensure view has focus when clicked for keyboard events
         self.setFocus()
+        # Rubber-band selection repaints large regions each move; promote to
+        # full updates for its duration, then drop back afterwards
+        if not self.gpu_enabled and self.dragMode() == QGraphicsView.RubberBandDrag:
+            self.setViewportUpdateMode(QGraphicsView.FullViewportUpdate)
         super().mousePressEvent(event)
 
+    def mouseReleaseEvent(self, event):
+        super().mouseReleaseEvent(event)
+        if not self.gpu_enabled:
+            self.setViewportUpdateMode(self.steady_update_mode)
+
+    def scrollContentsBy(self, dx, dy):
+        super().scrollContentsBy(dx, dy)
+        scene = self.scene()
+        if scene is not None:
+            scene.invalidate_visible_rect()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        scene = self.scene()
+        if scene is not None:
+            scene.invalidate_visible_rect()
+
 
 class MainWindow(QMainWindow):
     """Main application window."""
@@ -199,7 +242,7 @@ class MainWindow(QMainWindow):
         # Use custom view with proper focus handling
         self.view = DiagramView(self.scene, self)
         self.view.setRenderHint(QPainter.Antialiasing)
-        self.view.setViewportUpdateMode(QGraphicsView.FullViewportUpdate)
+        self.view.setViewportUpdateMode(self.view.steady_update_mode)
         self.view.setDragMode(QGraphicsView.RubberBandDrag)
         self.setCentralWidget(self.view)
         
@@ -207,11 +250,26 @@ class MainWindow(QMainWindow):
         
         self.scene.status_message.connect(self.statusBar().showMessage)
         self.scene.shape_selected.connect(self._on_shape_selected)
-        self.scene.text_selected.connect(self._on_text_selected)
+        self.scene.items_changed.connect(self._on_items_changed)
         
+        # Icons are rasterized after the window first paints, not during
+        # construction; (action, draw_func, antialias) triples queue here
+        self._pending_icons = []
+
         self._init_toolbar()
         self.statusBar().showMessage("Double-click to add shapes | Click to select | Right-click to label | Delete to remove")
-    
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._pending_icons:
+            QTimer.singleShot(0, self._rasterize_icons)
+
+    def _rasterize_icons(self):
+        """Fill in toolbar icons once the window is on screen."""
+        for action, draw_func, antialias in self._pending_icons:
+            action.setIcon(create_icon(draw_func, antialias=antialias))
+        self._pending_icons = []
+
     def _init_toolbar(self):
         toolbar = QToolBar("Tools")
         toolbar.setMovable(False)
@@ -235,35 +293,39 @@ class MainWindow(QMainWindow):
         ]
         
         for mode, tooltip, draw_func in tools:
-            icon = create_icon(draw_func)
-            action = QAction(icon, "", self)
+            action = QAction(QIcon(), "", self)
             action.setCheckable(True)
             action.setToolTip(tooltip)
-            action.triggered.connect(lambda checked, m=mode: self.scene.set_mode(m))
+            action.triggered.connect(partial(self._set_tool_mode, mode))
             self.tool_group.addAction(action)
             toolbar.addAction(action)
-            
+            # Rasterized after first paint; axis-aligned glyphs don't
+            # benefit from antialiasing
+            self._pending_icons.append(
+                (action, draw_func,
+                 draw_func not in (draw_rectangle, draw_text)))
+
             if mode == DiagramScene.MODE_RECTANGLE:
                 action.setChecked(True)
-        
+
         toolbar.addSeparator()
-        
+
         # Arrow tools
-        arrow_icon = create_icon(draw_arrow)
-        arrow_action = QAction(arrow_icon, "", self)
+        arrow_action = QAction(QIcon(), "", self)
         arrow_action.setCheckable(True)
         arrow_action.setToolTip("Arrow (click source, then target)")
-        arrow_action.triggered.connect(lambda: self.scene.set_mode(DiagramScene.MODE_ARROW))
+        arrow_action.triggered.connect(partial(self._set_tool_mode, DiagramScene.MODE_ARROW))
         self.tool_group.addAction(arrow_action)
         toolbar.addAction(arrow_action)
-        
-        bidir_icon = create_icon(draw_arrow_bidir)
-        bidir_action = QAction(bidir_icon, "", self)
+        self._pending_icons.append((arrow_action, draw_arrow, True))
+
+        bidir_action = QAction(QIcon(), "", self)
         bidir_action.setCheckable(True)
         bidir_action.setToolTip("Two-way arrow")
-        bidir_action.triggered.connect(lambda: self.scene.set_mode(DiagramScene.MODE_ARROW_BIDIR))
+        bidir_action.triggered.connect(partial(self._set_tool_mode, DiagramScene.MODE_ARROW_BIDIR))
         self.tool_group.addAction(bidir_action)
         toolbar.addAction(bidir_action)
+        self._pending_icons.append((bidir_action, draw_arrow_bidir, True))
         
         toolbar.addSeparator()
         
@@ -325,12 +387,12 @@ class MainWindow(QMainWindow):
         # Save/Load buttons
         save_action = QAction("Save", self)
         save_action.setToolTip("Save diagram to JSON")
-        save_action.triggered.connect(lambda: self.export_manager.export_json(self))
+        save_action.triggered.connect(partial(self._run_file_op, 'export_json'))
         toolbar.addAction(save_action)
         
         load_action = QAction("Load", self)
         load_action.setToolTip("Load diagram from JSON")
-        load_action.triggered.connect(lambda: self.export_manager.load_json(self))
+        load_action.triggered.connect(partial(self._run_file_op, 'load_json'))
         toolbar.addAction(load_action)
         
         toolbar.addSeparator()
@@ -338,12 +400,12 @@ class MainWindow(QMainWindow):
         # Export buttons
         export_svg = QAction("SVG", self)
         export_svg.setToolTip("Export to SVG")
-        export_svg.triggered.connect(lambda: self.export_manager.export_svg(self))
+        export_svg.triggered.connect(partial(self._run_file_op, 'export_svg'))
         toolbar.addAction(export_svg)
         
         export_png = QAction("PNG", self)
         export_png.setToolTip("Export to PNG")
-        export_png.triggered.connect(lambda: self.export_manager.export_png(self))
+        export_png.triggered.connect(partial(self._run_file_op, 'export_png'))
         toolbar.addAction(export_png)
         
         toolbar.addSeparator()
@@ -352,6 +414,16 @@ class MainWindow(QMainWindow):
         clear_action.setToolTip("Clear all")
         clear_action.triggered.connect(self.scene.clear_all)
         toolbar.addAction(clear_action)
+
+        toolbar.addSeparator()
+
+        # GPU compositing for busy scenes; CPU rasterization dominates once
+        # the item count grows
+        gpu_action = QAction("GPU", self)
+        gpu_action.setCheckable(True)
+        gpu_action.setToolTip("Render with OpenGL viewport")
+        gpu_action.toggled.connect(self._toggle_gpu)
+        toolbar.addAction(gpu_action)
     
     def _pick_color(self):
         current = self.color_button.get_color()
@@ -367,6 +439,39 @@ class MainWindow(QMainWindow):
             self.label_color_button.set_color(color)
             self.scene.set_label_color(color)
     
+    # Above this many items, clipping repaints to dirty rects costs more
+    # than redrawing the whole viewport
+    FULL_UPDATE_THRESHOLD = 500
+
+    def _on_items_changed(self, count):
+        """Retune the viewport update mode as the scene grows or shrinks."""
+        if count > self.FULL_UPDATE_THRESHOLD:
+            mode = QGraphicsView.FullViewportUpdate
+        else:
+            mode = QGraphicsView.SmartViewportUpdate
+        self.view.set_steady_update_mode(mode)
+
+    def _toggle_gpu(self, enabled):
+        """Swap the view between a raster and an OpenGL viewport."""
+        self.view.gpu_enabled = enabled
+        if enabled:
+            self.view.setViewport(QOpenGLWidget())
+            # OpenGL viewports don't support partial updates
+            self.view.setViewportUpdateMode(QGraphicsView.FullViewportUpdate)
+        else:
+            self.view.setViewport(QWidget())
+            self.view.setViewportUpdateMode(self.view.steady_update_mode)
+        self.view.setRenderHint(QPainter.Antialiasing)
+        self.scene.invalidate_visible_rect()
+
+    def _set_tool_mode(self, mode, checked=False):
+        """Adapter for QAction.triggered, which passes a checked bool."""
+        self.scene.set_mode(mode)
+
+    def _run_file_op(self, name, checked=False):
+        """Run a save/load/export method on the export manager."""
+        getattr(self.export_manager, name)(self)
+
     def _on_shape_selected(self, shape):
         # Update fill color button
         if hasattr(shape, 'get_color'):
@@ -375,20 +480,30 @@ class MainWindow(QMainWindow):
         # Update label color button if shape has a label
         if hasattr(shape, 'label') and shape.label and hasattr(shape, 'get_label_color'):
             self.label_color_button.set_color(shape.get_label_color())
-    
-    def _on_text_selected(self, text_shape):
+
+        # Text shapes additionally sync the formatting controls
+        if isinstance(shape, DiagramText):
+            self._update_text_controls(shape)
+
+    def _update_text_controls(self, text_shape):
         """Update formatting controls when a text shape is selected."""
-        # Block signals to avoid triggering changes while updating
+        # Block signals to avoid triggering changes while updating, and
+        # skip controls that already show the right state - re-selecting
+        # the same text item is the common case
         self.font_combo.blockSignals(True)
         self.size_spin.blockSignals(True)
         self.bold_action.blockSignals(True)
         self.underline_action.blockSignals(True)
-        
-        self.font_combo.setCurrentFont(QFont(text_shape.font_family))
-        self.size_spin.setValue(text_shape.font_size)
-        self.bold_action.setChecked(text_shape.is_bold)
-        self.underline_action.setChecked(text_shape.is_underline)
-        
+
+        if self.font_combo.currentFont().family() != text_shape.font_family:
+            self.font_combo.setCurrentFont(_family_font(text_shape.font_family))
+        if self.size_spin.value() != text_shape.font_size:
+            self.size_spin.setValue(text_shape.font_size)
+        if self.bold_action.isChecked() != text_shape.is_bold:
+            self.bold_action.setChecked(text_shape.is_bold)
+        if self.underline_action.isChecked() != text_shape.is_underline:
+            self.underline_action.setChecked(text_shape.is_underline)
+
         self.font_combo.blockSignals(False)
         self.size_spin.blockSignals(False)
         self.bold_action.blockSignals(False)
@@ -9,12 +9,26 @@ from arrows import Arrow
 from handles import ResizeHandle
 
 
+# Geometric shapes whose child items (labels) hit-test back to the parent
+_SHAPE_TYPES = (DiagramRect, DiagramOval, DiagramDiamond, DiagramTriangle,
+                DiagramTriangleInverted, DiagramTriangleLeft,
+                DiagramTriangleRight)
+
+# Item types tracked in the scene's export registry
+_EXPORTABLE_TYPES = _SHAPE_TYPES + (DiagramText,)
+
+
+def _as_qcolor(color):
+    """Return color as a QColor without copying when it already is one."""
+    return color if isinstance(color, QColor) else QColor(color)
+
+
 class DiagramScene(QGraphicsScene):
     """Scene managing diagram shapes and interactions."""
     
     shape_selected = pyqtSignal(object)
-    text_selected = pyqtSignal(object)  # Signal for text selection with formatting info
     status_message = pyqtSignal(str)
+    items_changed = pyqtSignal(int)  # Tracked item count, for viewport tuning
     
     MODE_SELECT = "Select"
     MODE_RECTANGLE = "Rectangle"
@@ -27,14 +41,41 @@ class DiagramScene(QGraphicsScene):
     MODE_TEXT = "Text"
     MODE_ARROW = "Arrow"
     MODE_ARROW_BIDIR = "Two-Way"
-    
+
+    # Mode -> shape class, one dict lookup instead of an if/elif chain;
+    # MODE_TEXT is handled separately since its constructor differs
+    _SHAPE_FACTORIES = {
+        MODE_RECTANGLE: DiagramRect,
+        MODE_OVAL: DiagramOval,
+        MODE_DIAMOND: DiagramDiamond,
+        MODE_TRIANGLE: DiagramTriangle,
+        MODE_TRIANGLE_INVERTED: DiagramTriangleInverted,
+        MODE_TRIANGLE_LEFT: DiagramTriangleLeft,
+        MODE_TRIANGLE_RIGHT: DiagramTriangleRight,
+    }
+
+    # Below this many items, BSP index maintenance costs more than the
+    # spatial queries it accelerates
+    INDEX_THRESHOLD = 50
+
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.setItemIndexMethod(QGraphicsScene.NoIndex)
+        self._bulk_update_active = False
         self.current_mode = self.MODE_RECTANGLE
         self.current_color = QColor("#3498db")
+        self._current_color_name = self.current_color.name()
         self.current_label_color = QColor("#333333")  # Separate label color
+        self._current_label_color_name = self.current_label_color.name()
         self.setBackgroundBrush(QColor("#f9f9f9"))
         self._arrow_start_shape = None
+        # Live registry of exportable items so export never has to scan
+        # every QGraphicsItem (handles, labels, arrowheads...)
+        self._export_shapes = []
+        self._export_arrows = []
+        # Cached viewport rect in scene coordinates; invalidated by the view
+        # on scroll/resize so arrows can cheaply test visibility
+        self._visible_rect = None
         # Text settings
         self.text_settings = {
             'font_family': 'Arial',
@@ -43,52 +84,145 @@ class DiagramScene(QGraphicsScene):
             'underline': False
         }
     
+    def _update_index_method(self):
+        """Pick the spatial index appropriate for the current item count."""
+        if len(self._export_shapes) + len(self._export_arrows) > self.INDEX_THRESHOLD:
+            method = QGraphicsScene.BspTreeIndex
+        else:
+            method = QGraphicsScene.NoIndex
+        if self.itemIndexMethod() != method:
+            self.setItemIndexMethod(method)
+
+    def begin_bulk_update(self):
+        """Suspend signals and spatial indexing for a bulk insert/remove."""
+        self._bulk_update_active = True
+        self.blockSignals(True)
+        self.setItemIndexMethod(QGraphicsScene.NoIndex)
+
+    def end_bulk_update(self):
+        """Re-enable signals and rebuild the spatial index once."""
+        self._bulk_update_active = False
+        self.blockSignals(False)
+        self._update_index_method()
+        self._emit_items_changed()
+
+    def _emit_items_changed(self):
+        self.items_changed.emit(
+            len(self._export_shapes) + len(self._export_arrows))
+
+    def addItem(self, item):
+        if isinstance(item, _EXPORTABLE_TYPES):
+            # Let the shape opt into hierarchical rendering tweaks
+            # (ItemHasNoContents etc.) before it joins the scene; done here
+            # so interactive creation and file loads behave the same
+            fast_paint = getattr(item, 'enable_fast_paint', None)
+            if fast_paint is not None:
+                fast_paint()
+        super().addItem(item)
+        if isinstance(item, Arrow):
+            self._export_arrows.append(item)
+        elif isinstance(item, _EXPORTABLE_TYPES):
+            self._export_shapes.append(item)
+        if not self._bulk_update_active:
+            self._update_index_method()
+            self._emit_items_changed()
+
+    def removeItem(self, item):
+        super().removeItem(item)
+        if isinstance(item, Arrow):
+            if item in self._export_arrows:
+                self._export_arrows.remove(item)
+        elif isinstance(item, _EXPORTABLE_TYPES):
+            if item in self._export_shapes:
+                self._export_shapes.remove(item)
+        if not self._bulk_update_active:
+            self._emit_items_changed()
+
+    def visible_rect(self):
+        """Return the viewport rect in scene coordinates, or None if no view."""
+        rect = self._visible_rect
+        if rect is None:
+            views = self.views()
+            if not views:
+                return None
+            view = views[0]
+            rect = view.mapToScene(view.viewport().rect()).boundingRect()
+            self._visible_rect = rect
+        return rect
+
+    def invalidate_visible_rect(self):
+        """Drop the cached viewport rect (called by the view on scroll/resize)."""
+        self._visible_rect = None
+        # Arrows that skipped geometry updates while off-screen may have
+        # scrolled into view; re-test them against the new rect
+        for arrow in self._export_arrows:
+            if arrow._update_deferred:
+                arrow.update_position()
+
     def set_mode(self, mode):
         self.current_mode = mode
         self._arrow_start_shape = None
         self.status_message.emit(f"Tool: {mode}")
     
     def set_color(self, color):
-        self.current_color = QColor(color)
+        self.current_color = _as_qcolor(color)
+        self._current_color_name = self.current_color.name()
         selected = self.selectedItems()
         if not selected:
             self.status_message.emit("Select an item first to change its color")
             return
         
+        changed = 0
         for item in selected:
             if isinstance(item, DiagramText):
                 # DiagramText: change text color
                 item.set_color(color)
-                self.status_message.emit("Text color changed")
-            elif hasattr(item, 'set_color'):
-                # Shape: change fill color
-                item.set_color(color)
-                self.status_message.emit("Shape color changed")
+                changed += 1
+            else:
+                # Shape: change fill color. Look the method up on the class
+                # once instead of a hasattr probe per instance
+                setter = getattr(type(item), 'set_color', None)
+                if setter is not None:
+                    setter(item, color)
+                    changed += 1
+        if changed:
+            self.status_message.emit(f"Color changed on {changed} item(s)")
     
     def set_label_color(self, color):
         """Set the current label color for new labels."""
-        self.current_label_color = QColor(color)
+        self.current_label_color = _as_qcolor(color)
+        self._current_label_color_name = self.current_label_color.name()
         # Apply to selected items' labels
-        selected = self.selectedItems()
-        for item in selected:
-            if hasattr(item, 'label') and item.label is not None:
-                if hasattr(item, 'set_label_color'):
-                    item.set_label_color(color)
-                    self.status_message.emit("Label color changed")
+        changed = 0
+        for item in self.selectedItems():
+            if getattr(item, 'label', None) is not None:
+                setter = getattr(type(item), 'set_label_color', None)
+                if setter is not None:
+                    setter(item, color)
+                    changed += 1
+        if changed:
+            self.status_message.emit(f"Label color changed on {changed} item(s)")
     
     def set_text_settings(self, font_family=None, font_size=None, bold=None, underline=None):
         """Update text settings and apply to selected text items and shape labels."""
-        if font_family is not None:
-            self.text_settings['font_family'] = font_family
-        if font_size is not None:
-            self.text_settings['font_size'] = font_size
-        if bold is not None:
-            self.text_settings['bold'] = bold
-        if underline is not None:
-            self.text_settings['underline'] = underline
-        
-        # Apply to selected items
-        for item in self.selectedItems():
+        settings = self.text_settings
+        dirty = False
+        for key, value in (('font_family', font_family), ('font_size', font_size),
+                           ('bold', bold), ('underline', underline)):
+            if value is not None and settings[key] != value:
+                settings[key] = value
+                dirty = True
+
+        # Signals can re-fire with unchanged values (e.g. combo updates while
+        # reflecting a selection); skip the item walk when there's nothing to do
+        selected = self.selectedItems()
+        if not dirty and not selected:
+            return
+
+        # Apply to selected items; status is emitted once after the loop so
+        # a large multi-select doesn't repaint the status bar per item
+        changed = 0
+        for item in selected:
             if isinstance(item, DiagramText):
                 # Apply all text settings to DiagramText
                 if font_family is not None:
@@ -99,48 +233,52 @@ class DiagramScene(QGraphicsScene):
                     item.set_bold(bold)
                 if underline is not None:
                     item.set_underline(underline)
+                changed += 1
             elif isinstance(item, Arrow):
                 # Apply font size to arrow labels
-                if font_size is not None and hasattr(item, 'set_label_font_size'):
+                if font_size is not None:
                     item.set_label_font_size(font_size)
-                    self.status_message.emit("Arrow label size changed")
-            elif hasattr(item, 'label') and item.label is not None:
+                    changed += 1
+            elif getattr(item, 'label', None) is not None:
                 # Apply font size to shape labels
-                if font_size is not None and hasattr(item, 'set_label_font_size'):
-                    item.set_label_font_size(font_size)
-                    self.status_message.emit("Label size changed")
+                if font_size is not None:
+                    setter = getattr(type(item), 'set_label_font_size', None)
+                    if setter is not None:
+                        setter(item, font_size)
+                        changed += 1
+        if changed:
+            self.status_message.emit(f"Text settings applied to {changed} item(s)")
     
+    def _hit_test(self, pos):
+        """Classify the items under pos with a single scene query.
+
+        Returns (shape, arrow, handle), each the topmost match or None.
+        Clicking a child item (like a label) resolves to its parent shape.
+        """
+        shape = arrow = handle = None
+        for item in self.items(pos):
+            if shape is None:
+                if isinstance(item, _EXPORTABLE_TYPES):
+                    shape = item
+                else:
+                    parent = item.parentItem()
+                    if parent and isinstance(parent, _SHAPE_TYPES):
+                        shape = parent
+            if arrow is None and isinstance(item, Arrow):
+                arrow = item
+            elif handle is None and isinstance(item, ResizeHandle):
+                handle = item
+        return shape, arrow, handle
+
     def get_shape_at(self, pos):
-        items = self.items(pos)
-        for item in items:
-            # Direct check for diagram shapes (including new triangle types)
-            if isinstance(item, (DiagramRect, DiagramOval, DiagramDiamond, 
-                                 DiagramTriangle, DiagramTriangleInverted,
-                                 DiagramTriangleLeft, DiagramTriangleRight,
-                                 DiagramText)):
-                return item
-            # Check if clicking on a child item (like a label) - return the parent shape
-            parent = item.parentItem()
-            if parent and isinstance(parent, (DiagramRect, DiagramOval, DiagramDiamond, 
-                                              DiagramTriangle, DiagramTriangleInverted,
-                                              DiagramTriangleLeft, DiagramTriangleRight)):
-                return parent
-        return None
-    
+        return self._hit_test(pos)[0]
+
     def get_arrow_at(self, pos):
-        items = self.items(pos)
-        for item in items:
-            if isinstance(item, Arrow):
-                return item
-        return None
-    
+        return self._hit_test(pos)[1]
+
     def get_handle_at(self, pos):
         """Check if there's a resize handle at the given position."""
-        items = self.items(pos)
-        for item in items:
-            if isinstance(item, ResizeHandle):
-                return item
-        return None
+        return self._hit_test(pos)[2]
     
     def mouseDoubleClickEvent(self, event):
         if self.current_mode in (self.MODE_SELECT, self.MODE_ARROW, self.MODE_ARROW_BIDIR):
@@ -157,24 +295,13 @@ class DiagramScene(QGraphicsScene):
         super().mouseDoubleClickEvent(event)
     
     def _create_shape(self, x, y):
-        color = self.current_color.name()
-        if self.current_mode == self.MODE_RECTANGLE:
-            return DiagramRect(x, y, color=color)
-        elif self.current_mode == self.MODE_OVAL:
-            return DiagramOval(x, y, color=color)
-        elif self.current_mode == self.MODE_DIAMOND:
-            return DiagramDiamond(x, y, color=color)
-        elif self.current_mode == self.MODE_TRIANGLE:
-            return DiagramTriangle(x, y, color=color)
-        elif self.current_mode == self.MODE_TRIANGLE_INVERTED:
-            return DiagramTriangleInverted(x, y, color=color)
-        elif self.current_mode == self.MODE_TRIANGLE_LEFT:
-            return DiagramTriangleLeft(x, y, color=color)
-        elif self.current_mode == self.MODE_TRIANGLE_RIGHT:
-            return DiagramTriangleRight(x, y, color=color)
-        elif self.current_mode == self.MODE_TEXT:
+        color = self._current_color_name
+        shape_cls = self._SHAPE_FACTORIES.get(self.current_mode)
+        if shape_cls is not None:
+            return shape_cls(x, y, color=color)
+        if self.current_mode == self.MODE_TEXT:
             return DiagramText(
-                x, y, 
+                x, y,
                 text="Text",
                 font_family=self.text_settings['font_family'],
                 font_size=self.text_settings['font_size'],
@@ -186,16 +313,15 @@ class DiagramScene(QGraphicsScene):
     
     def mousePressEvent(self, event):
         pos = event.scenePos()
-        
-        # Check if clicking on a resize handle first - let it handle its own events
-        handle = self.get_handle_at(pos)
+
+        # One spatial query classifies everything under the cursor
+        shape, arrow, handle = self._hit_test(pos)
+
+        # Resize handles take priority - let them handle their own events
         if handle and handle.isVisible():
             super().mousePressEvent(event)
             return
-        
-        shape = self.get_shape_at(pos)
-        arrow = self.get_arrow_at(pos)
-        
+
         if event.button() == Qt.RightButton:
             if shape:
                 self._add_label_to_shape(shape)
@@ -212,7 +338,7 @@ class DiagramScene(QGraphicsScene):
                     self.status_message.emit("Click destination shape")
                 elif shape != self._arrow_start_shape:
                     bidirectional = (self.current_mode == self.MODE_ARROW_BIDIR)
-                    new_arrow = Arrow(self._arrow_start_shape, shape, bidirectional,color=self.current_color.name())
+                    new_arrow = Arrow(self._arrow_start_shape, shape, bidirectional,color=self._current_color_name)
                     self.addItem(new_arrow)
                     self._arrow_start_shape.setSelected(False)
                     self._arrow_start_shape = None
@@ -234,10 +360,9 @@ class DiagramScene(QGraphicsScene):
                 if not shape.isSelected():
                     self.clearSelection()
                     shape.setSelected(True)
+                # One signal covers both shapes and text; the handler
+                # branches on the item type
                 self.shape_selected.emit(shape)
-                # Also emit text_selected for text shapes
-                if isinstance(shape, DiagramText):
-                    self.text_selected.emit(shape)
             elif arrow:
                 self.clearSelection()
                 arrow.setSelected(True)
@@ -304,33 +429,55 @@ class DiagramScene(QGraphicsScene):
         if not items:
             self.status_message.emit("Nothing selected")
             return
-        
+
+        # Coalesce the per-item invalidations into one repaint
+        view = self.views()[0] if self.views() else None
+        if view:
+            view.setUpdatesEnabled(False)
         for item in items:
             current_z = item.zValue()
             item.setZValue(current_z + delta)
-        
+        if view:
+            view.setUpdatesEnabled(True)
+
         direction = "up" if delta > 0 else "down"
         self.status_message.emit(f"Moved {len(items)} item(s) {direction} (z={items[0].zValue():.0f})")
-    
+
     def _delete_selected(self):
         items = self.selectedItems()
         if not items:
             self.status_message.emit("Nothing selected")
             return
-        
+
+        # Suspend view repaints and spatial indexing so N removals cost one
+        # index rebuild and one repaint instead of N of each
+        view = self.views()[0] if self.views() else None
+        if view:
+            view.setUpdatesEnabled(False)
+        self.setItemIndexMethod(QGraphicsScene.NoIndex)
+
         for item in items:
-            if hasattr(item, 'arrows'):
-                for arrow in item.arrows[:]:
+            arrows = getattr(item, 'arrows', None)
+            if arrows:
+                for arrow in list(arrows):
                     arrow.detach()
                     self.removeItem(arrow)
-            if hasattr(item, 'detach'):
-                item.detach()
+            detach = getattr(type(item), 'detach', None)
+            if detach is not None:
+                detach(item)
             self.removeItem(item)
-        
+
+        self._update_index_method()
+        if view:
+            view.setUpdatesEnabled(True)
+
         self.status_message.emit(f"Deleted {len(items)} item(s)")
     
     def clear_all(self):
         self.clear()
+        self._export_shapes = []
+        self._export_arrows = []
         self.setBackgroundBrush(QColor("#f9f9f9"))
         self._arrow_start_shape = None
+        self._emit_items_changed()
         self.status_message.emit("Canvas cleared")
\ No newline at end of file
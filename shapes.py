@@ -1,36 +1,167 @@
-from PyQt5.QtWidgets import (QGraphicsRectItem, QGraphicsEllipseItem, 
+from contextlib import contextmanager
+from functools import lru_cache
+
+from PyQt5.QtWidgets import (QGraphicsRectItem, QGraphicsEllipseItem,
                              QGraphicsPolygonItem, QGraphicsTextItem, QGraphicsItem)
-from PyQt5.QtCore import Qt, QPointF, QRectF
+from PyQt5.QtCore import Qt, QPointF, QRectF, QTimer
 from PyQt5.QtGui import QPolygonF, QColor, QPen, QBrush, QFont
 
 from handles import ResizeHandle
 
 
-class BaseShape:
+# Contrasting label colors per QRgb value, shared across all shapes
+_CONTRAST_CACHE = {}
+_WHITE = QColor("#ffffff")
+_DARK = QColor("#333333")
+
+
+def _as_qcolor(color):
+    """Return color as a QColor without copying when it already is one."""
+    return color if isinstance(color, QColor) else QColor(color)
+
+
+@lru_cache(maxsize=256)
+def _polygon_proto(vertex_spec, width, height):
+    """Outline prototype for a vertex spec at an integer size, built once."""
+    return QPolygonF([QPointF(fx * width, fy * height)
+                      for fx, fy in vertex_spec])
+
+
+class ConnectableMixin:
+    """Arrow-endpoint behavior shared by shapes and text items."""
+
+    def get_center(self):
+        rect = self.boundingRect()
+        return self.mapToScene(rect.center())
+
+    def scene_rect(self):
+        """Cached sceneBoundingRect, invalidated on move/resize.
+
+        The Qt item classes precede this mixin in the MRO, so
+        sceneBoundingRect itself can't be overridden; arrow geometry goes
+        through this accessor instead.
+        """
+        rect = self._cached_scene_rect
+        if rect is None:
+            rect = self._cached_scene_rect = self.sceneBoundingRect()
+        return rect
+
+    def invalidate_scene_rect(self):
+        self._cached_scene_rect = None
+
+    def get_connection_point(self, target_pos):
+        rect = self.scene_rect()
+        center = rect.center()
+
+        cx, cy = center.x(), center.y()
+        dx = target_pos.x() - cx
+        dy = target_pos.y() - cy
+
+        # Table lookup instead of nested branches: bit 1 picks the axis,
+        # bit 0 the direction along it
+        horiz = abs(dx) > abs(dy)
+        idx = (horiz << 1) | (dx > 0 if horiz else dy > 0)
+        return (QPointF(cx, rect.top()),
+                QPointF(cx, rect.bottom()),
+                QPointF(rect.left(), cy),
+                QPointF(rect.right(), cy))[idx]
+
+    def add_arrow(self, arrow):
+        self.arrows.add(arrow)
+
+    def remove_arrow(self, arrow):
+        self.arrows.discard(arrow)
+
+    def update_arrows(self):
+        # Coalesce: mouse moves arrive faster than frames render, so N
+        # calls per frame collapse into one deferred geometry pass
+        if not self.arrows or self._arrow_update_pending:
+            return
+        self._arrow_update_pending = True
+        QTimer.singleShot(0, self._flush_arrows)
+
+    def _flush_arrows(self):
+        self._arrow_update_pending = False
+        arrows = self.arrows
+        if not arrows:
+            return
+        center = self.get_center()
+        # Every connected item is an Arrow; resolve the method descriptor
+        # once instead of per iteration (hub nodes carry many arrows)
+        update = type(next(iter(arrows))).update_position
+        for arrow in arrows:
+            update(arrow, self, center)
+
+
+class BaseShape(ConnectableMixin):
     """Mixin providing common functionality for all diagram shapes."""
-    
+
     MIN_WIDTH = 40
     MIN_HEIGHT = 30
-    
+
+    # Set by bulk_load(); geometry callbacks no-op while a diagram loads
+    _BULK = False
+
+    # Static between edits: blit from a cached pixmap instead of re-stroking
+    # fills, outlines and label text every repaint. Class attribute so tests
+    # can opt out with QGraphicsItem.NoCache.
+    CACHE_MODE = QGraphicsItem.DeviceCoordinateCache
+
+    # Dragged handle -> new rect from (old rect, cursor pos); one table
+    # lookup replaces the four-way branch resize events used to take
+    _RESIZE_FNS = {
+        ResizeHandle.TOP_LEFT:
+            lambda r, p: QRectF(p, r.bottomRight()),
+        ResizeHandle.TOP_RIGHT:
+            lambda r, p: QRectF(QPointF(r.left(), p.y()),
+                                QPointF(p.x(), r.bottom())),
+        ResizeHandle.BOTTOM_LEFT:
+            lambda r, p: QRectF(QPointF(p.x(), r.top()),
+                                QPointF(r.right(), p.y())),
+        ResizeHandle.BOTTOM_RIGHT:
+            lambda r, p: QRectF(r.topLeft(), p),
+    }
+
+    def _compute_resize_rect(self, handle_pos, new_pos, rect):
+        """Map a dragged handle onto the shape's new normalized rect."""
+        return self._RESIZE_FNS[handle_pos](rect, new_pos).normalized()
+
     def _get_contrasting_color(self, color):
         """Return a contrasting color (white or dark) based on luminance."""
-        r, g, b = color.red(), color.green(), color.blue()
-        # Calculate perceived luminance
-        luminance = (0.299 * r + 0.587 * g + 0.114 * b) / 255
-        # Return white for dark colors, dark gray for light colors
-        return QColor("#ffffff") if luminance < 0.5 else QColor("#333333")
-    
+        rgb = color.rgb()
+        cached = _CONTRAST_CACHE.get(rgb)
+        if cached is not None:
+            return cached
+        # Integer BT.601 luminance; (77, 150, 29)/256 approximates
+        # (0.299, 0.587, 0.114) and thresholding at 128 matches 0.5
+        y = (77 * ((rgb >> 16) & 0xff)
+             + 150 * ((rgb >> 8) & 0xff)
+             + 29 * (rgb & 0xff)) >> 8
+        # White for dark colors, dark gray for light colors
+        result = _WHITE if y < 128 else _DARK
+        _CONTRAST_CACHE[rgb] = result
+        return result
+
     def init_shape(self, x, y, width, height, color):
         self.shape_width = width
         self.shape_height = height
         self.shape_color = QColor(color)
+        self._color_hex = self.shape_color.name()
         self.label = None
         self.label_color = self._get_contrasting_color(self.shape_color)
+        self._label_color_hex = self.label_color.name()
         self.label_font_size = 14  # Default label font size
-        self.arrows = []
+        self._last_center_key = None  # (w, h) the label was last centered for
+        self.arrows = set()
+        self._arrow_update_pending = False
+        self._cached_scene_rect = None
         self._resizing = False
         self._initial_rect = None
-        
+        # Pen and brush live for the shape's lifetime and are recolored in
+        # place; constructing them is expensive relative to a setColor
+        self._brush = QBrush(self.shape_color)
+        self._pen = QPen(self.shape_color.darker(120), 2)
+
         self.setPos(x, y)
         self.update_appearance()
         self.setFlags(
@@ -39,26 +170,29 @@ class BaseShape:
             QGraphicsItem.ItemSendsGeometryChanges
         )
         
-        self.handles = []
-        for pos in [ResizeHandle.TOP_LEFT, ResizeHandle.TOP_RIGHT,
-                    ResizeHandle.BOTTOM_LEFT, ResizeHandle.BOTTOM_RIGHT]:
-            handle = ResizeHandle(self, pos)
-            self.handles.append(handle)
-        self.update_handles()
+        # Created lazily on first selection - most shapes in a large
+        # diagram are never selected, and each handle is a QGraphicsItem
+        self.handles = None
+
+        self.setCacheMode(self.CACHE_MODE)
     
     def update_appearance(self):
-        self.setBrush(QBrush(self.shape_color))
-        self.setPen(QPen(self.shape_color.darker(120), 2))
+        self._brush.setColor(self.shape_color)
+        self._pen.setColor(self.shape_color.darker(120))
+        self.setBrush(self._brush)
+        self.setPen(self._pen)
     
     def set_color(self, color):
-        self.shape_color = QColor(color)
+        self.shape_color = _as_qcolor(color)
+        self._color_hex = self.shape_color.name()
         self.update_appearance()
-    
+
     def get_color(self):
         return self.shape_color
-    
+
     def set_label_color(self, color):
-        self.label_color = QColor(color)
+        self.label_color = _as_qcolor(color)
+        self._label_color_hex = self.label_color.name()
         if self.label:
             self.label.setDefaultTextColor(self.label_color)
     
@@ -72,6 +206,7 @@ class BaseShape:
             font = self.label.font()
             font.setPointSize(size)
             self.label.setFont(font)
+            self._last_center_key = None  # label size changed, recenter
             self.center_label()
     
     def get_label_font_size(self):
@@ -88,63 +223,64 @@ class BaseShape:
         font = QFont()
         font.setPointSize(self.label_font_size)
         self.label.setFont(font)
+        self._last_center_key = None  # label size changed, recenter
         self.center_label()
     
     def center_label(self):
         if self.label:
             rect = self.boundingRect()
+            # Micro-movements during resize don't change the integer size;
+            # skip the text relayout those calls would trigger
+            key = (int(rect.width()), int(rect.height()))
+            if key == self._last_center_key:
+                return
+            self._last_center_key = key
             label_rect = self.label.boundingRect()
             self.label.setPos(
                 rect.center().x() - label_rect.width() / 2,
                 rect.center().y() - label_rect.height() / 2
             )
     
-    def get_center(self):
-        rect = self.boundingRect()
-        return self.mapToScene(rect.center())
-    
-    def get_connection_point(self, target_pos):
-        center = self.get_center()
-        rect = self.sceneBoundingRect()
-        
-        dx = target_pos.x() - center.x()
-        dy = target_pos.y() - center.y()
-        
-        if abs(dx) > abs(dy):
-            if dx > 0:
-                return QPointF(rect.right(), center.y())
-            else:
-                return QPointF(rect.left(), center.y())
-        else:
-            if dy > 0:
-                return QPointF(center.x(), rect.bottom())
-            else:
-                return QPointF(center.x(), rect.top())
-    
-    def add_arrow(self, arrow):
-        if arrow not in self.arrows:
-            self.arrows.append(arrow)
-    
-    def remove_arrow(self, arrow):
-        if arrow in self.arrows:
-            self.arrows.remove(arrow)
-    
     def update_arrows(self):
-        for arrow in self.arrows:
-            arrow.update_position()
-    
+        # While resizing, schedule the deferred pass even with no arrows
+        # attached so the handles still track the new geometry
+        if self._resizing and not self.arrows and not self._arrow_update_pending:
+            self._arrow_update_pending = True
+            QTimer.singleShot(0, self._flush_arrows)
+            return
+        super().update_arrows()
+
+    def _flush_arrows(self):
+        # One deferred callback per frame repositions handles and arrows
+        # together instead of paying setPos churn on every resize tick
+        if self._resizing:
+            self.update_handles()
+        super()._flush_arrows()
+
+    def _create_handles(self):
+        self.handles = []
+        for pos in [ResizeHandle.TOP_LEFT, ResizeHandle.TOP_RIGHT,
+                    ResizeHandle.BOTTOM_LEFT, ResizeHandle.BOTTOM_RIGHT]:
+            handle = ResizeHandle(self, pos)
+            self.handles.append(handle)
+        self.update_handles()
+
     def update_handles(self):
+        if self.handles is None:
+            return
         rect = self.boundingRect()
-        positions = {
-            ResizeHandle.TOP_LEFT: rect.topLeft(),
-            ResizeHandle.TOP_RIGHT: rect.topRight(),
-            ResizeHandle.BOTTOM_LEFT: rect.bottomLeft(),
-            ResizeHandle.BOTTOM_RIGHT: rect.bottomRight()
-        }
-        for handle in self.handles:
-            handle.setPos(positions[handle.position])
+        # _create_handles stores TL, TR, BL, BR order; zip against the
+        # matching corners instead of building a dict per call
+        corners = (rect.topLeft(), rect.topRight(),
+                   rect.bottomLeft(), rect.bottomRight())
+        for handle, corner in zip(self.handles, corners):
+            handle.setPos(corner)
     
     def show_handles(self, visible):
+        if self.handles is None:
+            if not visible:
+                return
+            self._create_handles()
         for handle in self.handles:
             handle.setVisible(visible)
     
@@ -153,18 +289,50 @@ class BaseShape:
         self._initial_rect = self.boundingRect()
         # Temporarily disable moving while resizing
         self.setFlag(QGraphicsItem.ItemIsMovable, False)
-    
+        # Resizing changes the rect, not the position; drop the geometry
+        # notifications so Qt doesn't call back into Python per tick
+        # (handle_resize updates arrows explicitly)
+        self.setFlag(QGraphicsItem.ItemSendsGeometryChanges, False)
+
     def end_resize(self):
         self._resizing = False
         self._initial_rect = None
-        # Restore movability
+        # Restore movability and geometry notifications
         self.setFlag(QGraphicsItem.ItemIsMovable, True)
+        self.setFlag(QGraphicsItem.ItemSendsGeometryChanges, True)
         self.update_handles()
     
+    def enable_fast_paint(self):
+        """Hook for render-path tuning on newly created shapes.
+
+        Container-style shapes whose visuals live entirely in child items
+        can set QGraphicsItem.ItemHasNoContents here so Qt skips their own
+        paint() and clip-culls per child. The shapes in this module all draw
+        their own geometry, so the base hook does nothing.
+        """
+
+    @classmethod
+    @contextmanager
+    def bulk_load(cls):
+        """Silence per-item geometry callbacks while many items are built.
+
+        Construction fires setPos -> ItemPositionHasChanged -> update_arrows
+        for every shape even though arrows only exist once loading is done;
+        loaders wrap the whole construction pass in this context.
+        """
+        cls._BULK = True
+        try:
+            yield
+        finally:
+            cls._BULK = False
+
     def _on_item_change(self, change, value):
+        if BaseShape._BULK:
+            return
         if change == QGraphicsItem.ItemSelectedHasChanged:
             self.show_handles(value)
         elif change == QGraphicsItem.ItemPositionHasChanged:
+            self._cached_scene_rect = None
             self.update_arrows()
 
 
@@ -182,21 +350,12 @@ class DiagramRect(QGraphicsRectItem, BaseShape):
     def handle_resize(self, handle_pos, new_pos):
         if not self._resizing:
             return
-        rect = self.rect()
-        
-        if handle_pos == ResizeHandle.TOP_LEFT:
-            new_rect = QRectF(new_pos, rect.bottomRight())
-        elif handle_pos == ResizeHandle.TOP_RIGHT:
-            new_rect = QRectF(QPointF(rect.left(), new_pos.y()), 
-                             QPointF(new_pos.x(), rect.bottom()))
-        elif handle_pos == ResizeHandle.BOTTOM_LEFT:
-            new_rect = QRectF(QPointF(new_pos.x(), rect.top()),
-                             QPointF(rect.right(), new_pos.y()))
-        elif handle_pos == ResizeHandle.BOTTOM_RIGHT:
-            new_rect = QRectF(rect.topLeft(), new_pos)
-        
+        new_rect = self._compute_resize_rect(handle_pos, new_pos, self.rect())
+
         if new_rect.width() >= self.MIN_WIDTH and new_rect.height() >= self.MIN_HEIGHT:
-            self.setRect(new_rect.normalized())
+            self.setRect(new_rect)
+            self.update()  # invalidate the device-coordinate cache
+            self._cached_scene_rect = None
             self.shape_width = new_rect.width()
             self.shape_height = new_rect.height()
             self.center_label()
@@ -217,319 +376,146 @@ class DiagramOval(QGraphicsEllipseItem, BaseShape):
     def handle_resize(self, handle_pos, new_pos):
         if not self._resizing:
             return
-        rect = self.rect()
-        
-        if handle_pos == ResizeHandle.TOP_LEFT:
-            new_rect = QRectF(new_pos, rect.bottomRight())
-        elif handle_pos == ResizeHandle.TOP_RIGHT:
-            new_rect = QRectF(QPointF(rect.left(), new_pos.y()), 
-                             QPointF(new_pos.x(), rect.bottom()))
-        elif handle_pos == ResizeHandle.BOTTOM_LEFT:
-            new_rect = QRectF(QPointF(new_pos.x(), rect.top()),
-                             QPointF(rect.right(), new_pos.y()))
-        elif handle_pos == ResizeHandle.BOTTOM_RIGHT:
-            new_rect = QRectF(rect.topLeft(), new_pos)
-        
+        new_rect = self._compute_resize_rect(handle_pos, new_pos, self.rect())
+
         if new_rect.width() >= self.MIN_WIDTH and new_rect.height() >= self.MIN_HEIGHT:
-            self.setRect(new_rect.normalized())
+            self.setRect(new_rect)
+            self.update()  # invalidate the device-coordinate cache
+            self._cached_scene_rect = None
             self.shape_width = new_rect.width()
             self.shape_height = new_rect.height()
             self.center_label()
             self.update_arrows()
 
 
-class DiagramDiamond(QGraphicsPolygonItem, BaseShape):
-    """Diamond shape (decision node)."""
-    
-    def __init__(self, x, y, width=100, height=60, color="#e74c3c"):
+class DiagramPolygonShape(QGraphicsPolygonItem, BaseShape):
+    """Base for shapes whose outline is a list of fractional vertices.
+
+    Subclasses supply _vertex_spec as ((x_frac, y_frac), ...) of the
+    bounding box plus their default size and color; construction, resize
+    and polygon caching are shared.
+    """
+
+    _vertex_spec = ()
+    DEFAULT_WIDTH = 100
+    DEFAULT_HEIGHT = 60
+    DEFAULT_COLOR = "#3498db"
+
+    def __init__(self, x, y, width=None, height=None, color=None):
+        width = self.DEFAULT_WIDTH if width is None else width
+        height = self.DEFAULT_HEIGHT if height is None else height
+        color = self.DEFAULT_COLOR if color is None else color
         self._width = width
         self._height = height
-        poly = self._create_polygon(width, height)
-        super().__init__(poly)
+        super().__init__(self._create_polygon(width, height))
         self.init_shape(x, y, width, height, color)
-    
+
     def itemChange(self, change, value):
         self._on_item_change(change, value)
         return super().itemChange(change, value)
-    
+
     def _create_polygon(self, width, height):
-        return QPolygonF([
-            QPointF(width / 2, 0),
-            QPointF(width, height / 2),
-            QPointF(width / 2, height),
-            QPointF(0, height / 2)
-        ])
-    
+        # Copy the cached prototype so callers may translate it freely
+        return QPolygonF(_polygon_proto(self._vertex_spec,
+                                        int(width), int(height)))
+
     def handle_resize(self, handle_pos, new_pos):
         if not self._resizing:
             return
-        rect = self.boundingRect()
-        
-        if handle_pos == ResizeHandle.TOP_LEFT:
-            new_rect = QRectF(new_pos, rect.bottomRight())
-        elif handle_pos == ResizeHandle.TOP_RIGHT:
-            new_rect = QRectF(QPointF(rect.left(), new_pos.y()), 
-                             QPointF(new_pos.x(), rect.bottom()))
-        elif handle_pos == ResizeHandle.BOTTOM_LEFT:
-            new_rect = QRectF(QPointF(new_pos.x(), rect.top()),
-                             QPointF(rect.right(), new_pos.y()))
-        elif handle_pos == ResizeHandle.BOTTOM_RIGHT:
-            new_rect = QRectF(rect.topLeft(), new_pos)
-        
-        new_rect = new_rect.normalized()
-        
+        new_rect = self._compute_resize_rect(handle_pos, new_pos,
+                                             self.boundingRect())
+
         if new_rect.width() >= self.MIN_WIDTH and new_rect.height() >= self.MIN_HEIGHT:
             self._width = new_rect.width()
             self._height = new_rect.height()
             self.shape_width = self._width
             self.shape_height = self._height
-            
+
             new_poly = self._create_polygon(self._width, self._height)
             offset = new_rect.topLeft()
-            translated_poly = QPolygonF([p + offset for p in new_poly])
-            self.setPolygon(translated_poly)
-            
+            # Translate in C++ rather than adding QPointFs one by one
+            new_poly.translate(offset.x(), offset.y())
+            self.setPolygon(new_poly)
+            self.update()  # invalidate the device-coordinate cache
+            self._cached_scene_rect = None
+
             self.center_label()
             self.update_arrows()
 
 
-class DiagramTriangle(QGraphicsPolygonItem, BaseShape):
+class DiagramDiamond(DiagramPolygonShape):
+    """Diamond shape (decision node)."""
+
+    _vertex_spec = ((0.5, 0), (1, 0.5), (0.5, 1), (0, 0.5))
+    DEFAULT_COLOR = "#e74c3c"
+
+
+class DiagramTriangle(DiagramPolygonShape):
     """Triangle shape (pointing up)."""
-    
-    def __init__(self, x, y, width=100, height=80, color="#9b59b6"):
-        self._width = width
-        self._height = height
-        poly = self._create_polygon(width, height)
-        super().__init__(poly)
-        self.init_shape(x, y, width, height, color)
-    
-    def itemChange(self, change, value):
-        self._on_item_change(change, value)
-        return super().itemChange(change, value)
-    
-    def _create_polygon(self, width, height):
-        return QPolygonF([
-            QPointF(width / 2, 0),
-            QPointF(width, height),
-            QPointF(0, height)
-        ])
-    
-    def handle_resize(self, handle_pos, new_pos):
-        if not self._resizing:
-            return
-        rect = self.boundingRect()
-        
-        if handle_pos == ResizeHandle.TOP_LEFT:
-            new_rect = QRectF(new_pos, rect.bottomRight())
-        elif handle_pos == ResizeHandle.TOP_RIGHT:
-            new_rect = QRectF(QPointF(rect.left(), new_pos.y()), 
-                             QPointF(new_pos.x(), rect.bottom()))
-        elif handle_pos == ResizeHandle.BOTTOM_LEFT:
-            new_rect = QRectF(QPointF(new_pos.x(), rect.top()),
-                             QPointF(rect.right(), new_pos.y()))
-        elif handle_pos == ResizeHandle.BOTTOM_RIGHT:
-            new_rect = QRectF(rect.topLeft(), new_pos)
-        
-        new_rect = new_rect.normalized()
-        
-        if new_rect.width() >= self.MIN_WIDTH and new_rect.height() >= self.MIN_HEIGHT:
-            self._width = new_rect.width()
-            self._height = new_rect.height()
-            self.shape_width = self._width
-            self.shape_height = self._height
-            
-            new_poly = self._create_polygon(self._width, self._height)
-            offset = new_rect.topLeft()
-            translated_poly = QPolygonF([p + offset for p in new_poly])
-            self.setPolygon(translated_poly)
-            
-            self.center_label()
-            self.update_arrows()
 
+    _vertex_spec = ((0.5, 0), (1, 1), (0, 1))
+    DEFAULT_HEIGHT = 80
+    DEFAULT_COLOR = "#9b59b6"
 
-class DiagramTriangleInverted(QGraphicsPolygonItem, BaseShape):
+
+class DiagramTriangleInverted(DiagramPolygonShape):
     """Inverted triangle shape (pointing down)."""
-    
-    def __init__(self, x, y, width=100, height=80, color="#e67e22"):
-        self._width = width
-        self._height = height
-        poly = self._create_polygon(width, height)
-        super().__init__(poly)
-        self.init_shape(x, y, width, height, color)
-    
-    def itemChange(self, change, value):
-        self._on_item_change(change, value)
-        return super().itemChange(change, value)
-    
-    def _create_polygon(self, width, height):
-        return QPolygonF([
-            QPointF(0, 0),
-            QPointF(width, 0),
-            QPointF(width / 2, height)
-        ])
-    
-    def handle_resize(self, handle_pos, new_pos):
-        if not self._resizing:
-            return
-        rect = self.boundingRect()
-        
-        if handle_pos == ResizeHandle.TOP_LEFT:
-            new_rect = QRectF(new_pos, rect.bottomRight())
-        elif handle_pos == ResizeHandle.TOP_RIGHT:
-            new_rect = QRectF(QPointF(rect.left(), new_pos.y()), 
-                             QPointF(new_pos.x(), rect.bottom()))
-        elif handle_pos == ResizeHandle.BOTTOM_LEFT:
-            new_rect = QRectF(QPointF(new_pos.x(), rect.top()),
-                             QPointF(rect.right(), new_pos.y()))
-        elif handle_pos == ResizeHandle.BOTTOM_RIGHT:
-            new_rect = QRectF(rect.topLeft(), new_pos)
-        
-        new_rect = new_rect.normalized()
-        
-        if new_rect.width() >= self.MIN_WIDTH and new_rect.height() >= self.MIN_HEIGHT:
-            self._width = new_rect.width()
-            self._height = new_rect.height()
-            self.shape_width = self._width
-            self.shape_height = self._height
-            
-            new_poly = self._create_polygon(self._width, self._height)
-            offset = new_rect.topLeft()
-            translated_poly = QPolygonF([p + offset for p in new_poly])
-            self.setPolygon(translated_poly)
-            
-            self.center_label()
-            self.update_arrows()
+
+    _vertex_spec = ((0, 0), (1, 0), (0.5, 1))
+    DEFAULT_HEIGHT = 80
+    DEFAULT_COLOR = "#e67e22"
 
 
-class DiagramTriangleLeft(QGraphicsPolygonItem, BaseShape):
+class DiagramTriangleLeft(DiagramPolygonShape):
     """Left-facing triangle shape (pointing left)."""
-    
-    def __init__(self, x, y, width=80, height=100, color="#1abc9c"):
-        self._width = width
-        self._height = height
-        poly = self._create_polygon(width, height)
-        super().__init__(poly)
-        self.init_shape(x, y, width, height, color)
-    
-    def itemChange(self, change, value):
-        self._on_item_change(change, value)
-        return super().itemChange(change, value)
-    
-    def _create_polygon(self, width, height):
-        return QPolygonF([
-            QPointF(width, 0),
-            QPointF(width, height),
-            QPointF(0, height / 2)
-        ])
-    
-    def handle_resize(self, handle_pos, new_pos):
-        if not self._resizing:
-            return
-        rect = self.boundingRect()
-        
-        if handle_pos == ResizeHandle.TOP_LEFT:
-            new_rect = QRectF(new_pos, rect.bottomRight())
-        elif handle_pos == ResizeHandle.TOP_RIGHT:
-            new_rect = QRectF(QPointF(rect.left(), new_pos.y()), 
-                             QPointF(new_pos.x(), rect.bottom()))
-        elif handle_pos == ResizeHandle.BOTTOM_LEFT:
-            new_rect = QRectF(QPointF(new_pos.x(), rect.top()),
-                             QPointF(rect.right(), new_pos.y()))
-        elif handle_pos == ResizeHandle.BOTTOM_RIGHT:
-            new_rect = QRectF(rect.topLeft(), new_pos)
-        
-        new_rect = new_rect.normalized()
-        
-        if new_rect.width() >= self.MIN_WIDTH and new_rect.height() >= self.MIN_HEIGHT:
-            self._width = new_rect.width()
-            self._height = new_rect.height()
-            self.shape_width = self._width
-            self.shape_height = self._height
-            
-            new_poly = self._create_polygon(self._width, self._height)
-            offset = new_rect.topLeft()
-            translated_poly = QPolygonF([p + offset for p in new_poly])
-            self.setPolygon(translated_poly)
-            
-            self.center_label()
-            self.update_arrows()
+
+    _vertex_spec = ((1, 0), (1, 1), (0, 0.5))
+    DEFAULT_WIDTH = 80
+    DEFAULT_HEIGHT = 100
+    DEFAULT_COLOR = "#1abc9c"
 
 
-class DiagramTriangleRight(QGraphicsPolygonItem, BaseShape):
+class DiagramTriangleRight(DiagramPolygonShape):
     """Right-facing triangle shape (pointing right)."""
-    
-    def __init__(self, x, y, width=80, height=100, color="#3498db"):
-        self._width = width
-        self._height = height
-        poly = self._create_polygon(width, height)
-        super().__init__(poly)
-        self.init_shape(x, y, width, height, color)
-    
-    def itemChange(self, change, value):
-        self._on_item_change(change, value)
-        return super().itemChange(change, value)
-    
-    def _create_polygon(self, width, height):
-        return QPolygonF([
-            QPointF(0, 0),
-            QPointF(width, height / 2),
-            QPointF(0, height)
-        ])
-    
-    def handle_resize(self, handle_pos, new_pos):
-        if not self._resizing:
-            return
-        rect = self.boundingRect()
-        
-        if handle_pos == ResizeHandle.TOP_LEFT:
-            new_rect = QRectF(new_pos, rect.bottomRight())
-        elif handle_pos == ResizeHandle.TOP_RIGHT:
-            new_rect = QRectF(QPointF(rect.left(), new_pos.y()), 
-                             QPointF(new_pos.x(), rect.bottom()))
-        elif handle_pos == ResizeHandle.BOTTOM_LEFT:
-            new_rect = QRectF(QPointF(new_pos.x(), rect.top()),
-                             QPointF(rect.right(), new_pos.y()))
-        elif handle_pos == ResizeHandle.BOTTOM_RIGHT:
-            new_rect = QRectF(rect.topLeft(), new_pos)
-        
-        new_rect = new_rect.normalized()
-        
-        if new_rect.width() >= self.MIN_WIDTH and new_rect.height() >= self.MIN_HEIGHT:
-            self._width = new_rect.width()
-            self._height = new_rect.height()
-            self.shape_width = self._width
-            self.shape_height = self._height
-            
-            new_poly = self._create_polygon(self._width, self._height)
-            offset = new_rect.topLeft()
-            translated_poly = QPolygonF([p + offset for p in new_poly])
-            self.setPolygon(translated_poly)
-            
-            self.center_label()
-            self.update_arrows()
 
+    _vertex_spec = ((0, 0), (1, 0.5), (0, 1))
+    DEFAULT_WIDTH = 80
+    DEFAULT_HEIGHT = 100
+    DEFAULT_COLOR = "#3498db"
 
-class DiagramText(QGraphicsTextItem):
+
+
+class DiagramText(QGraphicsTextItem, ConnectableMixin):
     """Editable text label shape."""
     
     MIN_WIDTH = 20
     MIN_HEIGHT = 20
-    
+
+    # Text rasterization is the slowest part of QGraphicsTextItem; cache it
+    CACHE_MODE = QGraphicsItem.DeviceCoordinateCache
+
+
     def __init__(self, x, y, text="Text", font_family="Arial", font_size=14, 
                  color="#333333", bold=False, underline=False):
         super().__init__(text)
         
         self.text_color = QColor(color)
+        self._color_hex = self.text_color.name()
         self.font_family = font_family
         self.font_size = font_size
         self.is_bold = bold
         self.is_underline = underline
-        self.arrows = []
+        self.arrows = set()
+        self._arrow_update_pending = False
+        self._cached_scene_rect = None
         self.handles = []
         self.label = None  # For compatibility with BaseShape interface
         
         self.setPos(x, y)
         self.setDefaultTextColor(self.text_color)
+        # One QFont reused for the item's lifetime; the formatting setters
+        # fire per keystroke and only tweak the changed attribute
+        self._font = QFont(self.font_family, self.font_size)
         self.update_font()
         
         self.setFlags(
@@ -538,21 +524,27 @@ class DiagramText(QGraphicsTextItem):
             QGraphicsItem.ItemSendsGeometryChanges
         )
         self.setZValue(1)
-    
+        self.setCacheMode(self.CACHE_MODE)
+
     def update_font(self):
-        font = QFont(self.font_family, self.font_size)
+        font = self._font
+        font.setFamily(self.font_family)
+        font.setPointSize(self.font_size)
         font.setBold(self.is_bold)
         font.setUnderline(self.is_underline)
         self.setFont(font)
-    
+        self._cached_scene_rect = None  # font changes the bounding rect
+
     def set_text(self, text):
         self.setPlainText(text)
+        self._cached_scene_rect = None  # text changes the bounding rect
     
     def get_text(self):
         return self.toPlainText()
     
     def set_color(self, color):
-        self.text_color = QColor(color)
+        self.text_color = _as_qcolor(color)
+        self._color_hex = self.text_color.name()
         self.setDefaultTextColor(self.text_color)
     
     def get_color(self):
@@ -560,59 +552,35 @@ class DiagramText(QGraphicsTextItem):
     
     def set_font_family(self, family):
         self.font_family = family
-        self.update_font()
-    
+        self._font.setFamily(family)
+        self.setFont(self._font)
+        self._cached_scene_rect = None
+
     def set_font_size(self, size):
         self.font_size = size
-        self.update_font()
-    
+        self._font.setPointSize(size)
+        self.setFont(self._font)
+        self._cached_scene_rect = None
+
     def set_bold(self, bold):
         self.is_bold = bold
-        self.update_font()
-    
+        self._font.setBold(bold)
+        self.setFont(self._font)
+        self._cached_scene_rect = None
+
     def set_underline(self, underline):
         self.is_underline = underline
-        self.update_font()
-    
-    def get_center(self):
-        rect = self.boundingRect()
-        return self.mapToScene(rect.center())
-    
-    def get_connection_point(self, target_pos):
-        center = self.get_center()
-        rect = self.sceneBoundingRect()
-        
-        dx = target_pos.x() - center.x()
-        dy = target_pos.y() - center.y()
-        
-        if abs(dx) > abs(dy):
-            if dx > 0:
-                return QPointF(rect.right(), center.y())
-            else:
-                return QPointF(rect.left(), center.y())
-        else:
-            if dy > 0:
-                return QPointF(center.x(), rect.bottom())
-            else:
-                return QPointF(center.x(), rect.top())
-    
-    def add_arrow(self, arrow):
-        if arrow not in self.arrows:
-            self.arrows.append(arrow)
-    
-    def remove_arrow(self, arrow):
-        if arrow in self.arrows:
-            self.arrows.remove(arrow)
-    
-    def update_arrows(self):
-        for arrow in self.arrows:
-            arrow.update_position()
+        self._font.setUnderline(underline)
+        self.setFont(self._font)
+        self._cached_scene_rect = None
     
     def add_label(self, text):
         """For compatibility - just update the text content."""
         self.setPlainText(text)
+        self._cached_scene_rect = None  # text changes the bounding rect
     
     def itemChange(self, change, value):
-        if change == QGraphicsItem.ItemPositionHasChanged:
+        if change == QGraphicsItem.ItemPositionHasChanged and not BaseShape._BULK:
+            self._cached_scene_rect = None
             self.update_arrows()
         return super().itemChange(change, value)
\ No newline at end of file